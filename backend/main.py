@@ -1,4 +1,6 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
@@ -11,6 +13,20 @@ from routes.webhooks import router as webhook_router
 from routes.simple_messages import router as message_router
 from routes.messages import router as messages_people_router
 from routes.linkedinsearch import router as linkedinsearch_router
+from services.import_jobs import import_job_manager
+from services.unipile_service import unipile_service
+from services.async_supabase_service import async_supabase_service
+from services.unipile_resilience import UnipileUnavailable, deadline_scope, parse_budget
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await unipile_service.start()
+    await import_job_manager.start()
+    yield
+    await import_job_manager.stop()
+    await unipile_service.close()
+    async_supabase_service.shutdown()
 
 
 # Create FastAPI app with Swagger enabled
@@ -19,7 +35,8 @@ app = FastAPI(
     description="Real Gmail + LinkedIn message import via Unipile",
     version="1.0.0",
     docs_url="/docs",  # Swagger UI
-    redoc_url="/redoc"  # Alternative docs
+    redoc_url="/redoc",  # Alternative docs
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -31,6 +48,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """Every Unipile call made while serving this request shares its time budget"""
+    with deadline_scope(parse_budget(request.headers.get("X-Request-Timeout"))):
+        return await call_next(request)
+
+
+@app.exception_handler(UnipileUnavailable)
+async def unipile_unavailable_handler(request: Request, exc: UnipileUnavailable):
+    headers = {"Retry-After": str(max(1, round(exc.retry_after)))} if exc.retry_after else None
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
+
 # Include routes
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(webhook_router, prefix="/api", tags=["Webhooks"])
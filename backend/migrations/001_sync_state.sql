@@ -0,0 +1,12 @@
+-- Per-account sync watermarks used for incremental, resumable imports.
+create table if not exists sync_state (
+    account_id text primary key,
+    provider text,
+    status text not null default 'idle',
+    cursor text,                      -- backfill resume cursor (null once history is complete)
+    newest_timestamp text,            -- newest message timestamp fully stored
+    chats jsonb not null default '{}'::jsonb,  -- LinkedIn: chat_id -> {newest_timestamp, last_external_id}
+    last_import_id text,
+    last_synced_at timestamptz,
+    updated_at timestamptz not null default now()
+);
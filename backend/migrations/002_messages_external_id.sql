@@ -0,0 +1,13 @@
+-- Keep the provider's message id so re-imports and webhook redeliveries are no-ops.
+alter table messages add column if not exists external_id text;
+alter table messages add column if not exists thread_id text;
+
+-- NULL external ids (messages stored before this migration) never conflict.
+do $$
+begin
+    if not exists (select 1 from pg_constraint
+                   where conrelid = 'messages'::regclass and conname = 'messages_account_external_id_key') then
+        alter table messages
+            add constraint messages_account_external_id_key unique (account_id, external_id);
+    end if;
+end $$;
@@ -0,0 +1,15 @@
+-- Contact cluster of each person: the id of the person the cluster is named after.
+-- Same type as people.id, whatever that is in this project.
+do $$
+begin
+    execute format(
+        'alter table people add column if not exists cluster_id %s',
+        (select format_type(atttypid, atttypmod) from pg_attribute
+         where attrelid = 'people'::regclass and attname = 'id')
+    );
+end $$;
+
+create index if not exists people_cluster_id_idx on people (cluster_id);
+
+-- Existing people get their cluster from the batch rebuild:
+--   cd backend && python -m services.contact_clusters
@@ -0,0 +1,13 @@
+-- Message count, latest message and channels per contact (people grouped by cluster_id;
+-- people not clustered yet count on their own), so the people list is one query.
+create index if not exists messages_person_id_idx on messages (person_id);
+
+create or replace view contact_message_stats as
+select
+    coalesce(p.cluster_id, p.id) as contact_id,
+    count(*) as message_count,
+    max(m.timestamp) as last_message_date,
+    array_agg(distinct m.channel) as channels
+from messages m
+join people p on p.id = m.person_id
+group by coalesce(p.cluster_id, p.id);
@@ -0,0 +1,76 @@
+-- Per-person message rollup. Kept current by a trigger on messages since 007; before
+-- that the app's message write paths called apply_person_stats().
+-- person_id / last_message_date take the types of people.id / messages.timestamp.
+do $$
+begin
+    execute format(
+        'create table if not exists person_stats (
+            person_id %s primary key references people (id) on delete cascade,
+            message_count bigint not null default 0,
+            last_message_date %s,
+            channels text[] not null default ''{}'',
+            updated_at timestamptz not null default now()
+        )',
+        (select format_type(atttypid, atttypmod) from pg_attribute
+         where attrelid = 'people'::regclass and attname = 'id'),
+        (select format_type(atttypid, atttypmod) from pg_attribute
+         where attrelid = 'messages'::regclass and attname = 'timestamp')
+    );
+end $$;
+
+-- Add newly stored messages: deltas is a JSON array of
+-- {person_id, message_count, last_message_date, channels}, one entry per person.
+create or replace function apply_person_stats(deltas jsonb) returns void
+language sql as $$
+    insert into person_stats as s (person_id, message_count, last_message_date, channels, updated_at)
+    select d.person_id, d.message_count, d.last_message_date, coalesce(d.channels, '{}'), now()
+    from jsonb_populate_recordset(null::person_stats, deltas) d
+    on conflict (person_id) do update set
+        message_count = s.message_count + excluded.message_count,
+        last_message_date = greatest(s.last_message_date, excluded.last_message_date),
+        channels = array(select distinct unnest(s.channels || excluded.channels)),
+        updated_at = now();
+$$;
+
+-- Recompute every row from messages. Safe to run any time; returns the number of rows.
+create or replace function rebuild_person_stats() returns bigint
+language sql as $$
+    lock table person_stats in share row exclusive mode;
+
+    delete from person_stats s
+    where not exists (select 1 from messages m where m.person_id = s.person_id);
+
+    insert into person_stats as s (person_id, message_count, last_message_date, channels, updated_at)
+    select person_id, count(*), max(timestamp), array_agg(distinct channel), now()
+    from messages
+    where person_id is not null
+    group by person_id
+    on conflict (person_id) do update set
+        message_count = excluded.message_count,
+        last_message_date = excluded.last_message_date,
+        channels = excluded.channels,
+        updated_at = now();
+
+    select count(*) from person_stats;
+$$;
+
+select rebuild_person_stats();
+
+-- The people list now reads the rollup (one row per person) instead of every message.
+create or replace view contact_message_stats as
+with contacts as (
+    select coalesce(p.cluster_id, p.id) as contact_id, s.message_count, s.last_message_date, s.channels
+    from person_stats s
+    join people p on p.id = s.person_id
+)
+select t.contact_id, t.message_count, t.last_message_date, coalesce(c.channels, '{}') as channels
+from (
+    select contact_id, sum(message_count)::bigint as message_count, max(last_message_date) as last_message_date
+    from contacts
+    group by contact_id
+) t
+left join (
+    select contact_id, array_agg(distinct u.channel) as channels
+    from contacts, unnest(contacts.channels) as u(channel)
+    group by contact_id
+) c using (contact_id);
@@ -0,0 +1,2 @@
+-- Person timeline pages: newest first, keyset on (timestamp, id) within each person.
+create index if not exists messages_person_timeline_idx on messages (person_id, timestamp desc, id desc);
@@ -0,0 +1,37 @@
+-- person_stats is now maintained by a trigger on messages, in the same transaction as
+-- the insert. The app used to call apply_person_stats() after its insert had committed,
+-- so a rebuild running in between counted those messages twice, and a failed call left
+-- them uncounted for good. Rows skipped by an upsert's ON CONFLICT DO NOTHING are not
+-- in the transition table, so duplicates are never counted.
+-- rebuild_person_stats() locks person_stats before reading messages, so an insert either
+-- commits before the rebuild reads (and is counted by it) or its trigger waits for the
+-- rebuild to finish (and adds on top of it); it is never counted twice.
+create or replace function messages_person_stats() returns trigger
+language plpgsql as $$
+begin
+    insert into person_stats as s (person_id, message_count, last_message_date, channels, updated_at)
+    select person_id, count(*), max(timestamp),
+           coalesce(array_agg(distinct channel) filter (where channel is not null), '{}'), now()
+    from new_messages
+    where person_id is not null
+    group by person_id
+    on conflict (person_id) do update set
+        message_count = s.message_count + excluded.message_count,
+        last_message_date = greatest(s.last_message_date, excluded.last_message_date),
+        channels = array(select distinct unnest(s.channels || excluded.channels)),
+        updated_at = now();
+    return null;
+end $$;
+
+drop trigger if exists messages_person_stats on messages;
+create trigger messages_person_stats
+    after insert on messages
+    referencing new table as new_messages
+    for each statement execute function messages_person_stats();
+
+-- Nothing calls it any more; dropping it makes a not yet updated app fail loudly
+-- instead of counting its messages a second time.
+drop function if exists apply_person_stats(jsonb);
+
+-- Repair whatever drift the app-side increments left behind.
+select rebuild_person_stats();
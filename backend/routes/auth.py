@@ -7,6 +7,8 @@ import json
 import datetime
 from typing import List, Dict, Any
 
+from services.unipile_resilience import UnipileUnavailable
+
 router = APIRouter()
 
 # File-based storage for development
@@ -258,7 +260,8 @@ async def manual_oauth_success(request: Request):
         # 🚀 SIMPLE SOLUTION: Fetch all accounts and get the latest one for this provider
         print(f"🔍 Fetching latest {provider} account from Unipile...")
 
-        unipile_accounts = await unipile_service.get_all_accounts()
+        # An account was just connected, so the cached list cannot have it yet
+        unipile_accounts = await unipile_service.get_all_accounts(refresh=True)
         print(f"📥 Found {len(unipile_accounts)} total accounts in Unipile")
 
         # 🔧 FIX: Use correct field names from Unipile API
@@ -322,6 +325,9 @@ async def manual_oauth_success(request: Request):
             }
         }
 
+    except UnipileUnavailable:
+        # Unipile is down or slow: a fallback account would hide that and import nothing
+        raise
     except Exception as e:
         print(f"❌ Error fetching from Unipile: {e}")
 
@@ -461,7 +467,7 @@ async def sync_accounts_with_unipile():
 
 
 async def store_connected_account(account_data: dict, user_id: str):
-    from services.complete_import_service import complete_import_service
+    from services.import_jobs import import_job_manager, PRIORITY_LOW
     """Store account information after successful connection"""
     print(f"💾 Storing account: {account_data}")
 
@@ -490,8 +496,8 @@ async def store_connected_account(account_data: dict, user_id: str):
 
         print(f"✅ Account stored successfully: {account_data['provider']} - {account_id}")
 
-        # 🚀 IMPORT ALL REAL MESSAGES IMMEDIATELY
-        await complete_import_service.import_all_messages(account_id, account_data["provider"])
+        # 🚀 Queue the message import; workers run it in the background
+        account_info["import_id"] = await import_job_manager.enqueue(account_id, account_data["provider"], priority=PRIORITY_LOW)
 
         return account_info
 
@@ -543,6 +549,11 @@ async def connect_provider_account(provider: str):
 
         matching_accounts = [acc for acc in unipile_accounts if acc.get("type") == account_type]
 
+        if not matching_accounts:
+            # The account may have been connected after the list was cached
+            unipile_accounts = await unipile_service.get_all_accounts(refresh=True)
+            matching_accounts = [acc for acc in unipile_accounts if acc.get("type") == account_type]
+
         if not matching_accounts:
             return {
                 "success": False,
@@ -596,12 +607,15 @@ async def connect_provider_account(provider: str):
 async def unipile_webhook(request: Request):
     """Handle Unipile webhook notifications when accounts are connected"""
     try:
+        from services.unipile_service import unipile_service
+
         body = await request.json()
         print(f"🔔 Received Unipile webhook: {body}")
 
         # Handle account connection webhook
         if body.get("type") == "account.created" or body.get("object") == "Account":
             account_data = body.get("data", body)
+            unipile_service.invalidate_accounts(account_data.get("id"))
 
             # Store the real account with its actual Unipile ID
             account_info = {
@@ -1,10 +1,16 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import json
 import os
 import dotenv
 from services.unipile_linkedin_service import UnipileClient
-import requests
+from services.linkedin_filter_resolver import LinkedInFilterResolver
+from services.linkedin_people_stream import LinkedInPeopleStream
+from services.search_result_cache import search_result_cache
+from services.unipile_service import unipile_service
+from services.unipile_resilience import UnipileUnavailable
 
 router = APIRouter()
 
@@ -15,6 +21,7 @@ class PeopleSearchRequest(BaseModel):
     max_results: Optional[int] = 40
     count: Optional[int] = 50
     include_details: Optional[bool] = False
+    cursor: Optional[str] = None  # Next-page cursor from a previous streamed search
 
 class ParamIdResponse(BaseModel):
     id: Optional[str]
@@ -22,134 +29,64 @@ class ParamIdResponse(BaseModel):
     message: str
 
 @router.post("/linkedin/people-search")
-def linkedin_people_search(req: PeopleSearchRequest):
+async def linkedin_people_search(req: PeopleSearchRequest):
     """Search for people on LinkedIn using UnipileClient classic_people_search. Accepts human-readable filter strings."""
     try:
         client = UnipileClient()
         max_results = req.max_results if req.max_results is not None else 40
         count = req.count if req.count is not None else 50
         include_details = req.include_details if req.include_details is not None else False
-        filters = req.filters or {}
-        search_filters = {}
-        
-        # Map human-readable filters to LinkedIn IDs or process them
-        if "location" in filters and filters["location"]:
-            locations = [loc.strip() for loc in filters["location"].split(",")]
-            location_ids = []
-            for loc in locations:
-                loc_id = client.get_param_id("LOCATION", loc)
-                if loc_id:
-                    location_ids.append(loc_id)
-            if location_ids:
-                search_filters["location"] = location_ids
-        
-        if "industry" in filters and filters["industry"]:
-            industries = [ind.strip() for ind in filters["industry"].split(",")]
-            industry_ids = []
-            for ind in industries:
-                industry_id = client.get_param_id("INDUSTRY", ind)
-                if industry_id:
-                    industry_ids.append(industry_id)
-            if industry_ids:
-                search_filters["industry"] = industry_ids
-        
-        if "company" in filters and filters["company"]:
-            companies = [comp.strip() for comp in filters["company"].split(",")]
-            company_ids = []
-            for comp in companies:
-                company_id = client.get_param_id("COMPANY", comp)
-                if company_id:
-                    company_ids.append(company_id)
-            if company_ids:
-                search_filters["company"] = company_ids
-        
-        if "past_company" in filters and filters["past_company"]:
-            past_companies = [comp.strip() for comp in filters["past_company"].split(",")]
-            past_company_ids = []
-            for comp in past_companies:
-                company_id = client.get_param_id("COMPANY", comp)
-                if company_id:
-                    past_company_ids.append(company_id)
-            if past_company_ids:
-                search_filters["past_company"] = past_company_ids
-        
-        if "school" in filters and filters["school"]:
-            schools = [school.strip() for school in filters["school"].split(",")]
-            school_ids = []
-            for school in schools:
-                school_id = client.get_param_id("SCHOOL", school)
-                if school_id:
-                    school_ids.append(school_id)
-            if school_ids:
-                search_filters["school"] = school_ids
-        
-        if "service" in filters and filters["service"]:
-            services = [service.strip() for service in filters["service"].split(",")]
-            service_ids = []
-            for service in services:
-                service_id = client.get_param_id("SERVICE", service)
-                if service_id:
-                    service_ids.append(service_id)
-            if service_ids:
-                search_filters["service"] = service_ids
-        
-        # Direct string/array filters (no ID lookup needed)
-        if "keywords" in filters and filters["keywords"]:
-            search_filters["keywords"] = filters["keywords"]
-        
-        if "profile_language" in filters and filters["profile_language"]:
-            languages = [lang.strip() for lang in filters["profile_language"].split(",")]
-            search_filters["profile_language"] = languages
-        
-        if "network_distance" in filters and filters["network_distance"]:
-            distances = [int(dist.strip()) for dist in filters["network_distance"].split(",") if dist.strip().isdigit()]
-            if distances:
-                search_filters["network_distance"] = distances
-        
-        if "connections_of" in filters and filters["connections_of"]:
-            connections = [conn.strip() for conn in filters["connections_of"].split(",")]
-            search_filters["connections_of"] = connections
-        
-        if "followers_of" in filters and filters["followers_of"]:
-            followers = [foll.strip() for foll in filters["followers_of"].split(",")]
-            search_filters["followers_of"] = followers
-        
-        if "open_to" in filters and filters["open_to"]:
-            open_to_options = [opt.strip() for opt in filters["open_to"].split(",")]
-            search_filters["open_to"] = open_to_options
-        
-        # Advanced keywords (if provided as a single field with structured format)
-        if "advanced_keywords" in filters and filters["advanced_keywords"]:
-            # Expecting format like "first_name:John,last_name:Doe,title:Engineer"
-            advanced = {}
-            pairs = filters["advanced_keywords"].split(",")
-            for pair in pairs:
-                if ":" in pair:
-                    key, value = pair.split(":", 1)
-                    advanced[key.strip()] = value.strip()
-            if advanced:
-                search_filters["advanced_keywords"] = advanced
+        # All parameter id lookups run concurrently (and mostly hit the cache)
+        search_filters = await LinkedInFilterResolver(client).resolve(req.filters or {})
         
         print(f"🔍 Final search filters: {search_filters}")
         
-        results = client.classic_people_search(
-            search_filters, 
-            max_results=max_results, 
-            count=count, 
-            include_details=include_details
+        # Identical searches within a few minutes are answered from the result cache
+        results, cache = await search_result_cache.get_or_fetch(
+            search_result_cache.key(client.account_id, search_filters, max_results),
+            lambda: client.classic_people_search(search_filters, max_results=max_results, count=count)
         )
+        if include_details:
+            results = await client.enrich_profiles(results)
         
-        return {"success": True, "results": results, "count": len(results)}
+        return {"success": True, "results": results, "count": len(results), "cache": cache}
     
+    except UnipileUnavailable:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"LinkedIn people search failed: {str(e)}")
+
+@router.post("/linkedin/people-search/stream")
+async def linkedin_people_search_stream(req: PeopleSearchRequest):
+    """Same search as /linkedin/people-search, streamed as NDJSON: one line per result as soon as it is
+    ready, then a "done" line carrying the cursor for the next page (pass it back as `cursor`)."""
+    try:
+        client = UnipileClient()
+        search_filters = await LinkedInFilterResolver(client).resolve(req.filters or {})
+        print(f"🔍 Streaming search filters: {search_filters} (cursor={req.cursor})")
+    except UnipileUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LinkedIn people search failed: {str(e)}")
 
+    events = LinkedInPeopleStream(client).stream(
+        search_filters,
+        max_results=req.max_results if req.max_results is not None else 40,
+        count=req.count if req.count is not None else 50,
+        include_details=bool(req.include_details),
+        cursor=req.cursor
+    )
+    return StreamingResponse(
+        (json.dumps(event) + "\n" async for event in events),
+        media_type="application/x-ndjson"
+    )
+
 @router.get("/linkedin/param-id", response_model=ParamIdResponse)
-def get_param_id(param_type: str, keyword: str):
+async def get_param_id(param_type: str, keyword: str):
     """Get a LinkedIn parameter ID (e.g., for location, industry, company) using UnipileClient."""
     try:
         client = UnipileClient()
-        pid = client.get_param_id(param_type, keyword)
+        pid = await client.get_param_id(param_type, keyword)
         if pid:
             return ParamIdResponse(id=pid, found=True, message="Parameter ID found.")
         else:
@@ -158,14 +95,14 @@ def get_param_id(param_type: str, keyword: str):
         raise HTTPException(status_code=500, detail=f"Failed to get parameter ID: {str(e)}")
 
 @router.get("/linkedin/test-detailed-search")
-def test_detailed_search():
+async def test_detailed_search():
     """Test endpoint to see what detailed profiles look like"""
     try:
         client = UnipileClient()
         
         # Simple test search with details
         search_filters = {"keywords": "Python Developer"}
-        results = client.classic_people_search(
+        results = await client.classic_people_search(
             search_filters, 
             max_results=3, 
             count=10, 
@@ -183,15 +120,15 @@ def test_detailed_search():
         raise HTTPException(status_code=500, detail=f"Test failed: {str(e)}")
 
 @router.get("/linkedin/test-profile-fixed/{identifier}")
-def test_profile_fixed(identifier: str):
+async def test_profile_fixed(identifier: str):
     """Test the fixed profile details endpoint"""
     try:
         client = UnipileClient()
         
         # Test the corrected URL
-        resp = requests.get(
-            f"{client.base_url}/users/{identifier}",  # Fixed URL
-            headers=client.headers,
+        resp = await unipile_service.request(
+            "GET",
+            f"/users/{identifier}",  # Fixed URL
             params={"account_id": client.account_id},
             timeout=30
         )
@@ -199,7 +136,7 @@ def test_profile_fixed(identifier: str):
         return {
             "success": True,
             "identifier": identifier,
-            "url_used": resp.url,
+            "url_used": str(resp.url),
             "status_code": resp.status_code,
             "response_size": len(resp.text),
             "profile_data": resp.json() if resp.status_code == 200 else {},
@@ -210,7 +147,7 @@ def test_profile_fixed(identifier: str):
         raise HTTPException(status_code=500, detail=f"Profile test failed: {str(e)}")
 
 @router.get("/linkedin/test-multiple-profiles")
-def test_multiple_profiles():
+async def test_multiple_profiles():
     """Test multiple profiles to see data variations"""
     try:
         client = UnipileClient()
@@ -227,9 +164,9 @@ def test_multiple_profiles():
         
         for identifier in test_profiles:
             try:
-                resp = requests.get(
-                    f"{client.base_url}/users/{identifier}",
-                    headers=client.headers,
+                resp = await unipile_service.request(
+                    "GET",
+                    f"/users/{identifier}",
                     params={"account_id": client.account_id},
                     timeout=30
                 )
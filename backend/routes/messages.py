@@ -1,26 +1,49 @@
 # backend/routes/messages.py
 
-from fastapi import APIRouter, HTTPException
-from services.supabase_service import supabase_service
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+from services.async_supabase_service import async_supabase_service
+from typing import List, Dict, Any, Optional
 
 router = APIRouter()
 
+
+class PersonUpdate(BaseModel):
+    name: Optional[str] = None
+    email: Optional[str] = None
+
+
 @router.get("/people")
 async def get_all_people():
     """Get all people with message counts and latest message info"""
     try:
-        people = supabase_service.get_all_people_with_stats()
+        people = await async_supabase_service.get_all_people_with_stats()
         return {"people": people, "total": len(people)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.patch("/people/{person_id}")
+async def update_person(person_id: str, update: PersonUpdate):
+    """Rename a person or change their email; they (and, on a split, their old cluster) are re-clustered"""
+    if update.name is None and update.email is None:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    try:
+        person = await async_supabase_service.update_person(person_id, name=update.name, email=update.email)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not person:
+        raise HTTPException(status_code=404, detail="Person not found")
+    return {"person": person}
+
 @router.get("/people/{person_id}/messages")
-async def get_person_messages(person_id: str):
-    """Get all messages for a specific person"""
+async def get_person_messages(person_id: str, limit: Optional[int] = Query(None, ge=1, le=500), cursor: Optional[str] = None):
+    """Get messages for a specific person, newest first; with a limit, next_cursor fetches the next page"""
     try:
-        messages = supabase_service.get_messages_by_person(person_id)
-        return {"messages": messages, "total": len(messages)}
+        messages = await async_supabase_service.get_messages_by_person(person_id, limit, cursor)
+        next_cursor = async_supabase_service.timeline_cursor(messages) if limit and len(messages) == limit else None
+        return {"messages": messages, "total": len(messages), "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -28,7 +51,7 @@ async def get_person_messages(person_id: str):
 async def get_recent_messages(limit: int = 50):
     """Get recent messages across all accounts"""
     try:
-        messages = supabase_service.get_recent_messages(limit)
+        messages = await async_supabase_service.get_recent_messages(limit)
         return {"messages": messages, "total": len(messages)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -37,7 +60,7 @@ async def get_recent_messages(limit: int = 50):
 async def get_message_stats():
     """Get overall message statistics"""
     try:
-        stats = supabase_service.get_message_stats()
+        stats = await async_supabase_service.get_message_stats()
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,14 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from services.complete_import_service import complete_import_service
-from services.supabase_service import supabase_service
-import requests
+from fastapi import APIRouter, HTTPException, Query
+from services.import_jobs import import_job_manager, PRIORITY_HIGH
+from services.import_progress import import_progress
+from services.async_supabase_service import async_supabase_service
+from typing import Optional
 
 router = APIRouter()
 
 
 @router.post("/import/start/{account_id}")
-async def start_import(account_id: str):
-    """Start importing messages for an account"""
+async def start_import(account_id: str, full_resync: bool = False, priority: int = PRIORITY_HIGH):
+    """Queue an import for an account (only new messages unless full_resync is set) and return at once"""
     try:
         # Get account info
         from routes.auth import load_accounts
@@ -21,17 +22,18 @@ async def start_import(account_id: str):
         account = accounts[account_id]
         provider = account["provider"]
 
-        print(f"🚀 Starting import for {provider} account: {account_id}")
+        print(f"🚀 Queueing import for {provider} account: {account_id}")
 
-        # Call import with the correct provider
-        import_id = await complete_import_service.import_all_messages(account_id, provider)
+        import_id = await import_job_manager.enqueue(account_id, provider, priority=priority, full_resync=full_resync)
 
         return {
             "success": True,
             "import_id": import_id,
-            "message": f"Import started for {provider} account"
+            "message": f"Import queued for {provider} account"
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Import error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -39,20 +41,60 @@ async def start_import(account_id: str):
 
 @router.get("/import/status/{import_id}")
 async def get_import_status(import_id: str):
-    """Get import status"""
-    status = supabase_service.get_import_status(import_id)
+    """Get import status, served from memory while the import is running here"""
+    progress = import_progress.get(import_id)
+    status = progress.snapshot() if progress else await async_supabase_service.get_import_status(import_id)
 
     if not status:
         raise HTTPException(status_code=404, detail="Import not found")
 
+    # Job state (queued, paused, ...) for imports known to this process
+    job = import_job_manager.get_job(import_id)
+    if job:
+        status["job"] = job.to_dict()
+
     return status
 
 
+@router.get("/import/jobs")
+async def list_import_jobs():
+    """List queued, running and recently finished import jobs"""
+    jobs = import_job_manager.list_jobs()
+    return {"jobs": jobs, "total": len(jobs)}
+
+
+@router.post("/import/{import_id}/cancel")
+async def cancel_import(import_id: str):
+    """Cancel a queued or running import"""
+    job = await import_job_manager.cancel(import_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return {"success": job.status == "cancelled", "job": job.to_dict()}
+
+
+@router.post("/import/{import_id}/pause")
+async def pause_import(import_id: str):
+    """Pause a queued or running import; it resumes from its last checkpoint"""
+    job = await import_job_manager.pause(import_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return {"success": job.status == "paused", "job": job.to_dict()}
+
+
+@router.post("/import/{import_id}/resume")
+async def resume_import(import_id: str):
+    """Queue a paused import again"""
+    job = await import_job_manager.resume(import_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return {"success": job.status == "queued", "job": job.to_dict()}
+
+
 @router.get("/people")
 async def get_people():
     """Get all people"""
     try:
-        people = supabase_service.get_all_people_with_stats()
+        people = await async_supabase_service.get_all_people_with_stats()
         return {"people": people, "total": len(people)}
     except Exception as e:
         print(f"❌ Error getting people: {e}")
@@ -60,11 +102,14 @@ async def get_people():
 
 
 @router.get("/people/{person_id}/messages")
-async def get_person_messages(person_id: str):
-    """Get messages for a person"""
+async def get_person_messages(person_id: str, limit: Optional[int] = Query(None, ge=1, le=500), cursor: Optional[str] = None):
+    """Get messages for a person, newest first; with a limit, next_cursor fetches the next page"""
     try:
-        messages = supabase_service.get_messages_by_person(person_id)
-        return {"messages": messages, "total": len(messages)}
+        messages = await async_supabase_service.get_messages_by_person(person_id, limit, cursor)
+        next_cursor = async_supabase_service.timeline_cursor(messages) if limit and len(messages) == limit else None
+        return {"messages": messages, "total": len(messages), "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Error getting person messages: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -74,7 +119,7 @@ async def get_person_messages(person_id: str):
 async def get_recent_messages(limit: int = 20):
     """Get recent messages"""
     try:
-        messages = supabase_service.get_recent_messages(limit)
+        messages = await async_supabase_service.get_recent_messages(limit)
         return {"messages": messages, "total": len(messages)}
     except Exception as e:
         print(f"❌ Error getting recent messages: {e}")
@@ -4,8 +4,11 @@ from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 import json
+import os
 from datetime import datetime
 
+from services.unipile_resilience import UnipileUnavailable
+
 router = APIRouter()
 
 
@@ -52,6 +55,8 @@ async def handle_unipile_webhook(request: Request):
             from routes.auth import store_connected_account
 
             account_id = data.get("account_id")
+            # The account changed, so whatever is cached for it is stale
+            unipile_service.invalidate_accounts(account_id)
             account_info = await unipile_service.get_account_info(account_id)
             await store_connected_account(account_info, "default_user")
 
@@ -67,6 +72,9 @@ async def handle_unipile_webhook(request: Request):
                 "message": f"Unknown event: {event}"
             }
 
+    except UnipileUnavailable:
+        # Answered with 503 so Unipile delivers the webhook again later
+        raise
     except Exception as e:
         print(f"❌ Webhook error: {e}")
         raise HTTPException(status_code=400, detail=f"Webhook processing failed: {str(e)}")
@@ -74,7 +82,7 @@ async def handle_unipile_webhook(request: Request):
 
 async def handle_email_webhook(data: Dict[str, Any]):
     """Handle email received webhook"""
-    from services.supabase_service import supabase_service
+    from services.async_supabase_service import async_supabase_service
     from services.complete_import_service import complete_import_service
 
     try:
@@ -104,13 +112,13 @@ async def handle_email_webhook(data: Dict[str, Any]):
         }
 
         # Find or create person
-        person_id = supabase_service.find_or_create_person(
+        person_id = await async_supabase_service.find_or_create_person(
             email=sender_email,
             name=sender_name or complete_import_service._extract_name_from_email(sender_email)
         )
 
         # Store message
-        supabase_service.store_message(message, person_id, account_id)
+        await async_supabase_service.store_message(message, person_id, account_id)
 
         print(f"✅ Stored email from {sender_email}: {data.get('subject', 'No subject')}")
 
@@ -133,7 +141,7 @@ async def handle_email_webhook(data: Dict[str, Any]):
 
 async def handle_message_webhook(data: Dict[str, Any]):
     """Handle messaging (LinkedIn) webhook"""
-    from services.supabase_service import supabase_service
+    from services.async_supabase_service import async_supabase_service
 
     try:
         account_id = data.get("account_id")
@@ -162,13 +170,13 @@ async def handle_message_webhook(data: Dict[str, Any]):
         }
 
         # Find or create person
-        person_id = supabase_service.find_or_create_person(
+        person_id = await async_supabase_service.find_or_create_person(
             email=None,
             name=sender_name
         )
 
         # Store message
-        supabase_service.store_message(message, person_id, account_id)
+        await async_supabase_service.store_message(message, person_id, account_id)
 
         print(f"✅ Stored LinkedIn message from {sender_name}: {message_content[:50]}...")
 
@@ -191,7 +199,7 @@ async def handle_message_webhook(data: Dict[str, Any]):
 async def handle_new_message_simple(data: Dict[str, Any]):
     """Handle new message webhook - reuse existing parsing logic"""
     from services.complete_import_service import complete_import_service
-    from services.supabase_service import supabase_service
+    from services.async_supabase_service import async_supabase_service
     from routes.auth import load_accounts
 
     try:
@@ -239,7 +247,7 @@ async def handle_new_message_simple(data: Dict[str, Any]):
                     }
 
                     # Find or create person
-                    person_id = supabase_service.find_or_create_person(
+                    person_id = await async_supabase_service.find_or_create_person(
                         email=sender,
                         name=complete_import_service._extract_name_from_email(sender)
                     )
@@ -270,7 +278,7 @@ async def handle_new_message_simple(data: Dict[str, Any]):
                     }
 
                     # Find or create person
-                    person_id = supabase_service.find_or_create_person(
+                    person_id = await async_supabase_service.find_or_create_person(
                         email=None,
                         name=sender
                     )
@@ -279,7 +287,7 @@ async def handle_new_message_simple(data: Dict[str, Any]):
                     continue
 
                 # Store the message
-                supabase_service.store_message(message, person_id, account_id)
+                await async_supabase_service.store_message(message, person_id, account_id)
                 stored_count += 1
                 print(f"💬 Stored new {message['channel']} message from {sender}")
 
@@ -301,7 +309,6 @@ async def handle_new_message_simple(data: Dict[str, Any]):
 async def configure_webhooks_for_account(account_id: str):
     """Configure webhooks for an account after connection"""
     try:
-        import httpx
         from services.unipile_service import unipile_service
 
         backend_url = os.getenv('BACKEND_URL', 'http://localhost:8000')
@@ -316,19 +323,14 @@ async def configure_webhooks_for_account(account_id: str):
 
         print(f"🔔 Configuring webhooks for {account_id}")
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{unipile_service.base_url}/webhooks",
-                headers=unipile_service.headers,
-                json=payload
-            )
+        response = await unipile_service.request("POST", "/webhooks", json=payload)
 
-            if response.status_code in [200, 201]:
-                print(f"✅ Webhooks configured for {account_id}")
-                return True
-            else:
-                print(f"⚠️ Webhook config failed: {response.status_code}")
-                return False
+        if response.status_code in [200, 201]:
+            print(f"✅ Webhooks configured for {account_id}")
+            return True
+        else:
+            print(f"⚠️ Webhook config failed: {response.status_code}")
+            return False
 
     except Exception as e:
         print(f"❌ Error configuring webhooks: {e}")
@@ -348,43 +350,35 @@ async def test_webhook():
 async def check_account_webhooks(account_id: str):
     """Check if webhooks are configured for an account"""
     from services.unipile_service import unipile_service
-    import httpx
 
     try:
         # Check if webhooks exist for this account
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Get webhooks for the account
-            response = await client.get(
-                f"{unipile_service.base_url}/accounts/{account_id}/webhooks",
-                headers=unipile_service.headers
-            )
-
-            if response.status_code == 200:
-                webhooks = response.json().get("items", [])
-
-                # Also check global webhooks
-                global_response = await client.get(
-                    f"{unipile_service.base_url}/webhooks",
-                    headers=unipile_service.headers
-                )
-
-                global_webhooks = []
-                if global_response.status_code == 200:
-                    all_webhooks = global_response.json().get("items", [])
-                    global_webhooks = [w for w in all_webhooks if w.get("account_id") == account_id]
-
-                return {
-                    "account_id": account_id,
-                    "account_webhooks": webhooks,
-                    "global_webhooks": global_webhooks,
-                    "webhook_configured": len(webhooks) > 0 or len(global_webhooks) > 0,
-                    "webhook_count": len(webhooks) + len(global_webhooks)
-                }
-            else:
-                return {
-                    "error": f"Failed to get webhooks: {response.status_code}",
-                    "details": response.text
-                }
+        # Get webhooks for the account
+        response = await unipile_service.request("GET", f"/accounts/{account_id}/webhooks")
+
+        if response.status_code == 200:
+            webhooks = response.json().get("items", [])
+
+            # Also check global webhooks
+            global_response = await unipile_service.request("GET", "/webhooks")
+
+            global_webhooks = []
+            if global_response.status_code == 200:
+                all_webhooks = global_response.json().get("items", [])
+                global_webhooks = [w for w in all_webhooks if w.get("account_id") == account_id]
+
+            return {
+                "account_id": account_id,
+                "account_webhooks": webhooks,
+                "global_webhooks": global_webhooks,
+                "webhook_configured": len(webhooks) > 0 or len(global_webhooks) > 0,
+                "webhook_count": len(webhooks) + len(global_webhooks)
+            }
+        else:
+            return {
+                "error": f"Failed to get webhooks: {response.status_code}",
+                "details": response.text
+            }
 
     except Exception as e:
         return {"error": str(e)}
@@ -394,7 +388,6 @@ async def check_account_webhooks(account_id: str):
 async def configure_webhook_for_account(account_id: str):
     """Configure webhook for a specific account using Unipile's correct format"""
     from services.unipile_service import unipile_service
-    import httpx
     import os
 
     backend_url = os.getenv('BACKEND_URL', 'http://localhost:8000')
@@ -406,65 +399,56 @@ async def configure_webhook_for_account(account_id: str):
     results = []
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # 1. Configure EMAIL webhook
-            email_webhook = {
-                "request_url": webhook_url,
-                "source": "email",  # Required field
-                "events": ["mail_received"],  # Use Unipile's exact event names
-                "account_ids": [account_id],  # Target specific account
-                "format": "json",
-                "enabled": True
-            }
+        # 1. Configure EMAIL webhook
+        email_webhook = {
+            "request_url": webhook_url,
+            "source": "email",  # Required field
+            "events": ["mail_received"],  # Use Unipile's exact event names
+            "account_ids": [account_id],  # Target specific account
+            "format": "json",
+            "enabled": True
+        }
 
-            print("📧 Creating email webhook...")
-            email_response = await client.post(
-                f"{unipile_service.base_url}/webhooks",
-                headers=unipile_service.headers,
-                json=email_webhook
-            )
-
-            results.append({
-                "type": "email",
-                "status": email_response.status_code,
-                "success": email_response.status_code in [200, 201],
-                "response": email_response.json() if email_response.status_code in [200, 201] else email_response.text
-            })
-
-            # 2. Configure MESSAGING webhook (for LinkedIn)
-            messaging_webhook = {
-                "request_url": webhook_url,
-                "source": "messaging",  # Required field
-                "events": ["message_received"],  # Use Unipile's exact event names
-                "account_ids": [account_id],  # Target specific account
-                "format": "json",
-                "enabled": True
-            }
+        print("📧 Creating email webhook...")
+        email_response = await unipile_service.request("POST", "/webhooks", json=email_webhook)
 
-            print("💬 Creating messaging webhook...")
-            messaging_response = await client.post(
-                f"{unipile_service.base_url}/webhooks",
-                headers=unipile_service.headers,
-                json=messaging_webhook
-            )
+        results.append({
+            "type": "email",
+            "status": email_response.status_code,
+            "success": email_response.status_code in [200, 201],
+            "response": email_response.json() if email_response.status_code in [200, 201] else email_response.text
+        })
 
-            results.append({
-                "type": "messaging",
-                "status": messaging_response.status_code,
-                "success": messaging_response.status_code in [200, 201],
-                "response": messaging_response.json() if messaging_response.status_code in [200,
-                                                                                            201] else messaging_response.text
-            })
+        # 2. Configure MESSAGING webhook (for LinkedIn)
+        messaging_webhook = {
+            "request_url": webhook_url,
+            "source": "messaging",  # Required field
+            "events": ["message_received"],  # Use Unipile's exact event names
+            "account_ids": [account_id],  # Target specific account
+            "format": "json",
+            "enabled": True
+        }
 
-            # Check if at least one webhook was created successfully
-            any_success = any(r["success"] for r in results)
+        print("💬 Creating messaging webhook...")
+        messaging_response = await unipile_service.request("POST", "/webhooks", json=messaging_webhook)
 
-            return {
-                "success": any_success,
-                "webhook_url": webhook_url,
-                "results": results,
-                "message": "Webhooks configured" if any_success else "Failed to configure webhooks"
-            }
+        results.append({
+            "type": "messaging",
+            "status": messaging_response.status_code,
+            "success": messaging_response.status_code in [200, 201],
+            "response": messaging_response.json() if messaging_response.status_code in [200,
+                                                                                        201] else messaging_response.text
+        })
+
+        # Check if at least one webhook was created successfully
+        any_success = any(r["success"] for r in results)
+
+        return {
+            "success": any_success,
+            "webhook_url": webhook_url,
+            "results": results,
+            "message": "Webhooks configured" if any_success else "Failed to configure webhooks"
+        }
 
     except Exception as e:
         print(f"❌ Error configuring webhook: {e}")
@@ -503,20 +487,15 @@ async def configure_all_account_webhooks():
 async def delete_webhook(webhook_id: str):
     """Delete a specific webhook"""
     from services.unipile_service import unipile_service
-    import httpx
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.delete(
-                f"{unipile_service.base_url}/webhooks/{webhook_id}",
-                headers=unipile_service.headers
-            )
+        response = await unipile_service.request("DELETE", f"/webhooks/{webhook_id}")
 
-            return {
-                "success": response.status_code in [200, 204],
-                "status": response.status_code,
-                "message": "Webhook deleted" if response.status_code in [200, 204] else response.text
-            }
+        return {
+            "success": response.status_code in [200, 204],
+            "status": response.status_code,
+            "message": "Webhook deleted" if response.status_code in [200, 204] else response.text
+        }
     except Exception as e:
         return {"success": False, "error": str(e)}
 
@@ -525,39 +504,31 @@ async def delete_webhook(webhook_id: str):
 async def clear_and_reconfigure_webhooks(account_id: str):
     """Clear all webhooks for an account and reconfigure"""
     from services.unipile_service import unipile_service
-    import httpx
 
     try:
         # First, get all webhooks
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{unipile_service.base_url}/webhooks",
-                headers=unipile_service.headers
-            )
-
-            if response.status_code == 200:
-                all_webhooks = response.json().get("items", [])
-
-                # Delete webhooks for this account
-                deleted = 0
-                for webhook in all_webhooks:
-                    if account_id in webhook.get("account_ids", []):
-                        delete_response = await client.delete(
-                            f"{unipile_service.base_url}/webhooks/{webhook['id']}",
-                            headers=unipile_service.headers
-                        )
-                        if delete_response.status_code in [200, 204]:
-                            deleted += 1
-
-                # Now reconfigure
-                config_result = await configure_webhook_for_account(account_id)
-
-                return {
-                    "deleted_webhooks": deleted,
-                    "configuration_result": config_result
-                }
-            else:
-                return {"error": "Failed to get webhooks"}
+        response = await unipile_service.request("GET", "/webhooks")
+
+        if response.status_code == 200:
+            all_webhooks = response.json().get("items", [])
+
+            # Delete webhooks for this account
+            deleted = 0
+            for webhook in all_webhooks:
+                if account_id in webhook.get("account_ids", []):
+                    delete_response = await unipile_service.request("DELETE", f"/webhooks/{webhook['id']}")
+                    if delete_response.status_code in [200, 204]:
+                        deleted += 1
+
+            # Now reconfigure
+            config_result = await configure_webhook_for_account(account_id)
+
+            return {
+                "deleted_webhooks": deleted,
+                "configuration_result": config_result
+            }
+        else:
+            return {"error": "Failed to get webhooks"}
 
     except Exception as e:
         return {"error": str(e)}
\ No newline at end of file
@@ -0,0 +1,56 @@
+# backend/services/async_supabase_service.py
+
+import asyncio
+import functools
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from services.supabase_service import SupabaseService, supabase_service
+
+
+class AsyncSupabaseService:
+    """Awaitable SupabaseService: the same method names, run on a bounded thread pool.
+
+    supabase-py's client is synchronous, so calling it from a coroutine stalls the
+    event loop (and every other request) for the whole PostgREST round trip.
+    Here each call runs on one of SUPABASE_MAX_WORKERS threads instead, so many
+    queries can be in flight while the loop keeps serving. Attributes and
+    static helpers such as person_key are passed through unchanged.
+    """
+
+    def __init__(self, service: SupabaseService, max_workers: int = None):
+        self.service = service
+        self.max_workers = max_workers or int(os.getenv("SUPABASE_MAX_WORKERS", "16"))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="supabase")
+        self.in_flight = 0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call on the database pool and wait for it without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.service, name)
+        if name.startswith("_") or not callable(attr) or \
+                isinstance(inspect.getattr_static(type(self.service), name, None), staticmethod):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        return call
+
+    def shutdown(self):
+        """Stop the pool (called from the app lifespan)"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance
+async_supabase_service = AsyncSupabaseService(supabase_service)
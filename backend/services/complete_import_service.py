@@ -1,247 +1,447 @@
 import asyncio
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, AsyncIterator, Optional
 from datetime import datetime
-from services.supabase_service import supabase_service
+from services.async_supabase_service import async_supabase_service
 from services.unipile_service import unipile_service
+from services.unipile_resilience import UnipileUnavailable
+from services.import_pipeline import ImportPipeline
+from services.identity_cache import IdentityCache
+from services.import_progress import import_progress
 
 
 class CompleteImportService:
     def __init__(self):
-        self.db = supabase_service
-
-    async def import_all_messages(self, account_id: str, provider: str) -> str:
-        print(f"✨ Starting COMPLETE import for {provider} account: {account_id}")
+        # Awaitable Supabase calls so database round trips never block the event loop
+        self.db = async_supabase_service
+        # How many LinkedIn chats have their message history fetched at once
+        self.linkedin_chat_concurrency = int(os.getenv("LINKEDIN_CHAT_CONCURRENCY", "8"))
+        self.linkedin_page_size = 100
+        self.gmail_page_size = 100
+        # Pages buffered between pipeline stages before fetching pauses
+        self.pipeline_queue_size = int(os.getenv("IMPORT_PIPELINE_QUEUE_SIZE", "4"))
+        self.pipelines: Dict[str, ImportPipeline] = {}
+
+    async def import_all_messages(self, account_id: str, provider: str, full_resync: bool = False) -> str:
+        """Import an account's messages, incrementally from its sync watermarks unless full_resync is set"""
+        print(f"✨ Starting {'FULL' if full_resync else 'INCREMENTAL'} import for {provider} account: {account_id}")
         try:
-            import_id = self.db.create_import_status(account_id)
-            await self._import_messages(import_id, account_id, provider)
+            import_id = await self.db.create_import_status(account_id)
+            await self._import_messages(import_id, account_id, provider, full_resync=full_resync)
             return import_id
         except Exception as e:
             print(f"❌ Complete import failed: {e}")
             raise e
 
-    async def _import_messages(self, import_id: str, account_id: str, provider: str):
+    async def run_import(self, import_id: str, account_id: str, provider: str,
+                         full_resync: bool = False) -> Optional[Dict[str, int]]:
+        """Run an import for an already created import_status row (used by the job workers).
+
+        Returns the stored/duplicates/skipped/failed message counts.
+        """
+        print(f"✨ Running {'FULL' if full_resync else 'INCREMENTAL'} import {import_id} for {provider} account: {account_id}")
+        return await self._import_messages(import_id, account_id, provider, full_resync=full_resync)
+
+    async def _import_messages(self, import_id: str, account_id: str, provider: str, full_resync: bool = False):
+        sync_state = None
+        progress = import_progress.start(import_id, account_id, provider)
+        progress.extra["pipeline"] = lambda: self.get_pipeline_stats(import_id)
+        progress.extra["rate_limits"] = lambda: unipile_service.rate_limiter.stats(account_id) or None
         try:
-            self.db.update_import_status(import_id, "fetching")
+            progress.set_stage("fetching")
+            sync_state = await self._load_sync_state(account_id, provider, full_resync)
 
             if provider.upper() == "GOOGLE":
-                messages = await self._get_gmail_messages(account_id)
+                source = self._get_gmail_messages(account_id, sync_state)
+                parse = self._parse_gmail_email
             elif provider.upper() == "LINKEDIN":
-                messages = await self._get_linkedin_messages(account_id)
+                source = self._get_linkedin_messages(account_id, sync_state)
+                parse = self._parse_linkedin_message
             else:
                 raise Exception(f"Unsupported provider: {provider}")
 
-            print(f"📊 Got {len(messages)} messages from {provider}")
-
-            if not messages:
-                self.db.update_import_status(import_id, "completed", total=0, processed=0)
+            totals = {"stored": 0, "duplicates": 0, "skipped": 0, "failed": 0, "people": set()}
+            progress.extra["failed_messages"] = lambda: totals["failed"] or None
+            # Senders seen by earlier batches of this import resolve without touching the database
+            identities = IdentityCache()
+
+            async def write(batch: List[Dict[str, Any]]) -> int:
+                fetch_stage = pipeline.stages["fetch"]
+                progress.update(total=fetch_stage.items, total_final=fetch_stage.finished_at is not None)
+                progress.set_stage("processing")
+                result = await self._store_all_messages(
+                    import_id, batch, account_id,
+                    processed_offset=totals["stored"] + totals["duplicates"],
+                    progress=progress,
+                    identities=identities
+                )
+                totals["stored"] += result["stored"]
+                totals["duplicates"] += result["duplicates"]
+                totals["skipped"] += result["skipped"]
+                totals["failed"] += result["failed"]
+                totals["people"].update(result["people"])
+                if result["failed"]:
+                    # Keep the last checkpoint so the failed rows are fetched again next run
+                    sync_state["status"] = "failed"
+                return result["stored"]
+
+            async def checkpoint(token: Dict[str, Any]):
+                if sync_state["status"] != "failed":
+                    self._advance_sync_state(sync_state, token)
+                    await self.db.save_sync_state(account_id, sync_state)
+
+            # Fetch, parse and write overlap; bounded queues cap memory in between
+            pipeline = ImportPipeline(
+                source,
+                parse,
+                write,
+                queue_size=self.pipeline_queue_size,
+                batch_size=self.db.bulk_chunk_size,
+                checkpoint=checkpoint
+            )
+            self.pipelines[import_id] = pipeline
+            try:
+                stats = await pipeline.run()
+            finally:
+                self.pipelines.pop(import_id, None)
+
+            if sync_state["status"] != "failed":
+                sync_state["status"] = "idle"
+            sync_state["last_import_id"] = import_id
+            sync_state["last_synced_at"] = datetime.now().isoformat()
+            await self.db.save_sync_state(account_id, sync_state)
+
+            fetched = stats["fetch"]["items"]
+            print(f"📊 Got {fetched} messages from {provider}")
+            for stage in stats.values():
+                print(f"   ⏱️ {stage['stage']}: {stage['items']} items, "
+                      f"{stage['throughput_per_sec']}/s, avg {stage['avg_latency_ms']}ms")
+
+            progress.update(processed=totals["stored"] + totals["duplicates"], total=fetched, total_final=True)
+            # Rows whose write chunk failed are fetched again next run, but this run did not store them
+            await import_progress.finish(import_id, "partial" if totals["failed"] else "completed")
+            summary = {key: totals[key] for key in ("stored", "duplicates", "skipped", "failed")}
+
+            if not fetched:
                 print("⚠️ No messages found")
-                return
+                return summary
 
-            await self._store_all_messages(import_id, messages, account_id)
+            print(f"{'⚠️ IMPORT PARTIAL' if totals['failed'] else '✅ IMPORT COMPLETE'}: "
+                  f"{totals['stored']} stored, {totals['duplicates']} already stored, "
+                  f"{totals['skipped']} skipped, {totals['failed']} failed, {len(totals['people'])} people")
+            print(f"   👥 Identity cache: {identities.stats()}")
+            return summary
 
         except Exception as e:
             print(f"❌ Import failed: {e}")
-            self.db.update_import_status(import_id, "failed")
+            await import_progress.finish(import_id, "failed")
+            if sync_state is not None:
+                # Checkpoints already saved stay put; the next run resumes from them
+                sync_state["status"] = "failed"
+                await self.db.save_sync_state(account_id, sync_state)
             raise e
+        finally:
+            # Cancelled or paused imports: flush the last counters, the job manager sets the status
+            await import_progress.finish(import_id)
+
+    async def _load_sync_state(self, account_id: str, provider: str, full_resync: bool) -> Dict[str, Any]:
+        """Load the account's watermarks, or start from scratch for a first or full sync"""
+        state = None if full_resync else await self.db.get_sync_state(account_id)
+        if state and state.get("status") == "running":
+            print(f"♻️ Resuming interrupted import for {account_id}")
+
+        state = {
+            "provider": provider.upper(),
+            "cursor": (state or {}).get("cursor"),
+            "newest_timestamp": (state or {}).get("newest_timestamp"),
+            "chats": (state or {}).get("chats") or {},
+            "status": "running"
+        }
+        await self.db.save_sync_state(account_id, state)
+        return state
+
+    def _advance_sync_state(self, state: Dict[str, Any], token: Dict[str, Any]):
+        """Move the watermarks forward for a page that is now fully stored"""
+        if token["phase"] == "backfill":
+            state["cursor"] = token["cursor"]
+        elif token["phase"] == "chat":
+            state["chats"][token["chat_id"]] = {
+                "newest_timestamp": token["newest"],
+                "last_external_id": token["last_external_id"]
+            }
 
-    async def _get_gmail_messages(self, account_id: str) -> List[Dict[str, Any]]:
-        """Get ALL Gmail messages from Unipile"""
-        print(f"📧 Fetching ALL Gmail messages for {account_id}")
-
-        try:
-            # Check if account exists first
-            try:
-                account_info = await unipile_service.get_account_info(account_id)
-                print(f"✅ Gmail account found: {account_info.get('name', 'Unknown')}")
-            except Exception as e:
-                print(f"❌ Gmail account {account_id} not found in Unipile: {e}")
-                return []
-
-            # Fetch Gmail emails using emails endpoint
-            emails = await self._fetch_gmail_emails(account_id)
-
-            if not emails:
-                print("❌ No Gmail emails found")
-                return []
-
-            print(f"📧 Processing {len(emails)} Gmail emails")
-
-            # Parse each email
-            parsed_messages = []
-            for raw_email in emails:
-                try:
-                    # Extract Gmail email data
-                    sender = self._extract_email_sender(raw_email)
-                    recipient = self._extract_email_recipient(raw_email)
-
-                    if not sender or "@" not in sender:
-                        continue
-
-                    message = {
-                        "channel": "email",
-                        "sender": sender,
-                        "recipient": recipient,
-                        "subject": raw_email.get("subject", ""),
-                        "content": self._extract_email_content(raw_email),
-                        "timestamp": self._extract_timestamp(raw_email),
-                        "external_id": raw_email.get("id", ""),
-                        "thread_id": raw_email.get("thread_id", "")
-                    }
-
-                    parsed_messages.append(message)
+        newest = token.get("newest")
+        if newest and (not state["newest_timestamp"] or newest > state["newest_timestamp"]):
+            state["newest_timestamp"] = newest
 
-                except Exception as e:
-                    print(f"❌ Error parsing Gmail email: {e}")
-                    continue
+    def get_pipeline_stats(self, import_id: str) -> Optional[Dict[str, Any]]:
+        """Live stage counters for a running import, if it is running in this process"""
+        pipeline = self.pipelines.get(import_id)
+        return pipeline.stats() if pipeline else None
 
-            print(f"✅ Parsed {len(parsed_messages)} Gmail messages")
-            return parsed_messages
+    async def _get_gmail_messages(self, account_id: str, sync_state: Dict[str, Any]) -> AsyncIterator[Any]:
+        """Yield (raw page, checkpoint) pairs covering only mail not yet stored.
 
-        except Exception as e:
-            print(f"❌ Gmail fetch error: {e}")
-            return []
+        Two passes: new mail since newest_timestamp (the watermark only moves once
+        the whole pass is stored), then the history backfill, which resumes from the
+        saved cursor after an interrupted run.
+        """
+        print(f"📧 Fetching Gmail messages for {account_id}")
 
-    async def _fetch_gmail_emails(self, account_id: str) -> List[Dict[str, Any]]:
-        """Fetch emails using the emails endpoint"""
+        # Check if account exists first
         try:
-            import httpx
-
-            headers = {
-                "X-API-KEY": unipile_service.api_key,
-                "Content-Type": "application/json",
-                "accept": "application/json"
-            }
-
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{unipile_service.base_url}/emails",
-                    headers=headers,
-                    params={"account_id": account_id, "limit": 100}
-                )
-
-                print(f"📥 Gmail emails API response: {response.status_code}")
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("items", [])
-                else:
-                    print(f"❌ Gmail emails API error: {response.text}")
-                    return []
-
+            account_info = await unipile_service.get_account_info(account_id)
+            print(f"✅ Gmail account found: {account_info.get('name', 'Unknown')}")
         except Exception as e:
-            print(f"❌ Error fetching Gmail emails: {e}")
-            return []
+            # Fail the import rather than completing it with nothing imported
+            print(f"❌ Gmail account {account_id} not found in Unipile: {e}")
+            raise
+
+        watermark = sync_state.get("newest_timestamp")
+
+        if watermark:
+            run_newest = watermark
+            async for emails, _ in self._fetch_gmail_emails(account_id, after=watermark):
+                fresh = [email for email in emails if self._extract_timestamp(email) > watermark]
+                run_newest = max([run_newest] + [self._extract_timestamp(email) for email in fresh])
+                print(f"📧 Processing {len(fresh)} new Gmail emails")
+                yield fresh, None
+                if len(fresh) < len(emails):
+                    break
+            yield [], {"phase": "head", "newest": run_newest}
 
+        if not watermark or sync_state.get("cursor"):
+            async for emails, next_cursor in self._fetch_gmail_emails(account_id, cursor=sync_state.get("cursor")):
+                print(f"📧 Processing {len(emails)} Gmail emails")
+                newest = max([self._extract_timestamp(email) for email in emails], default=None)
+                yield emails, {"phase": "backfill", "cursor": next_cursor, "newest": newest}
 
-    async def _get_linkedin_messages(self, account_id: str) -> List[Dict[str, Any]]:
-        print(f"💼 Fetching ALL LinkedIn messages for {account_id}")
+    def _parse_gmail_email(self, raw_email: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Convert a Unipile email into our message format, or None if it has no usable sender"""
         try:
-            all_messages = await self._fetch_linkedin_chats_and_messages(account_id)
-            if not all_messages:
-                print("❌ No LinkedIn messages found")
-                return []
-
-            print(f"💼 Processing {len(all_messages)} LinkedIn messages")
-            parsed_messages = []
-            print(f"Type of all_messages: {type(all_messages)}")
-            print(f"🔍 Preview: {str(all_messages)[:500]}")
-
-            for raw_msg in all_messages:
-                print('yessssssssss')
-                try:
-                    print(f"   📬 Parsing LinkedIn message: {raw_msg.get('id', 'Unknown ID')}")
-                    sender = self._extract_linkedin_sender(raw_msg)
-                    print(f"   📬 Processing message from: {sender}")
-                    content = self._extract_linkedin_content(raw_msg)
-
-                    if not content.strip():
-                        print(f"⚠️ Skipping message with no content")
-                        continue
-
-                    message = {
-                        "channel": "linkedin",
-                        "sender": sender,
-                        "recipient": "You" if sender != "You" else "LinkedIn Contact",
-                        "subject": raw_msg.get("subject", ""),
-                        "content": content.strip(),
-                        "timestamp": self._extract_timestamp(raw_msg),
-                        "external_id": raw_msg.get("id", ""),
-                        "thread_id": raw_msg.get("chat_id", "")
-                    }
-
-                    parsed_messages.append(message)
-                    print(f"   ✅ Parsed: {sender} -> {content[:50]}...")
+            # Extract Gmail email data
+            sender = self._extract_email_sender(raw_email)
+            recipient = self._extract_email_recipient(raw_email)
+
+            if not sender or "@" not in sender:
+                return None
+
+            return {
+                "channel": "email",
+                "sender": sender,
+                "recipient": recipient,
+                "subject": raw_email.get("subject", ""),
+                "content": self._extract_email_content(raw_email),
+                "timestamp": self._extract_timestamp(raw_email),
+                "external_id": raw_email.get("id", ""),
+                "thread_id": raw_email.get("thread_id", "")
+            }
 
-                except Exception as e:
-                    print(f"❌ Error parsing LinkedIn message: {e}")
-                    continue
+        except Exception as e:
+            print(f"❌ Error parsing Gmail email: {e}")
+            return None
 
-            print(f"✅ Successfully parsed {len(parsed_messages)} LinkedIn messages")
-            return parsed_messages
+    async def _fetch_gmail_emails(self, account_id: str, cursor: str = None,
+                                  after: str = None) -> AsyncIterator[Any]:
+        """Yield (emails, next cursor) pages from the emails endpoint, following the cursor to the end"""
+        while True:
+            params = {"account_id": account_id, "limit": self.gmail_page_size}
+            if cursor:
+                params["cursor"] = cursor
+            if after:
+                params["after"] = after
 
-        except Exception as e:
-            print(f"❌ LinkedIn fetch error: {e}")
-            return []
-
-    async def _fetch_linkedin_chats_and_messages(self, account_id: str) -> List[Dict[str, Any]]:
-        import httpx
-        headers = {
-            "X-API-KEY": unipile_service.api_key,
-            "Content-Type": "application/json",
-            "accept": "application/json"
-        }
-        all_messages = []
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            cursor = None
-            all_chats = []
+            response = await unipile_service.request("GET", "/emails", params=params, timeout=60.0)
 
-            while True:
-                params = {"account_id": account_id, "limit": 20}
-                if cursor:
-                    params["cursor"] = cursor
+            print(f"📥 Gmail emails API response: {response.status_code}")
 
-                response = await client.get(f"{unipile_service.base_url}/chats", headers=headers, params=params)
-                if response.status_code != 200:
-                    print(f"❌ Chats API error: {response.text}")
-                    break
+            # Fail loudly so the import keeps its checkpoint instead of looking complete
+            if response.status_code != 200:
+                raise Exception(f"Gmail emails API error {response.status_code}: {response.text}")
 
-                data = response.json()
-                chats = data.get("items", [])
-                cursor = data.get("cursor")
+            data = response.json()
+            emails = data.get("items", [])
+            cursor = data.get("cursor")
 
-                if not chats:
-                    break
+            yield emails, cursor
 
-                all_chats.extend(chats)
-                if len(all_chats) >= 20 or not cursor:
-                    break
+            if not emails or not cursor:
+                break
 
-                await asyncio.sleep(0.1)
+    async def _get_linkedin_messages(self, account_id: str, sync_state: Dict[str, Any]) -> AsyncIterator[Any]:
+        """Yield (raw page, checkpoint) pairs for LinkedIn messages newer than each chat's watermark"""
+        print(f"💼 Fetching LinkedIn messages for {account_id}")
+        async for page, token in self._fetch_linkedin_chats_and_messages(account_id, sync_state.get("chats") or {}):
+            yield page, token
 
-            print(f"💬 Found {len(all_chats)} chats")
+    def _parse_linkedin_message(self, raw_msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Convert a Unipile chat message into our message format, or None if it has no content"""
+        try:
+            sender = self._extract_linkedin_sender(raw_msg)
+            content = self._extract_linkedin_content(raw_msg)
+
+            if not content.strip():
+                print(f"⚠️ Skipping message with no content")
+                return None
+
+            return {
+                "channel": "linkedin",
+                "sender": sender,
+                "recipient": "You" if sender != "You" else "LinkedIn Contact",
+                "subject": raw_msg.get("subject", ""),
+                "content": content.strip(),
+                "timestamp": self._extract_timestamp(raw_msg),
+                "external_id": raw_msg.get("id", ""),
+                "thread_id": raw_msg.get("chat_id", "")
+            }
 
-            for i, chat in enumerate(all_chats):
-                chat_id = chat.get("id")
-                if not chat_id:
-                    continue
+        except Exception as e:
+            print(f"❌ Error parsing LinkedIn message: {e}")
+            return None
+
+    async def _iter_linkedin_chats(self, account_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Walk the /chats cursor until every chat has been listed"""
+        cursor = None
+        listed = 0
+
+        while True:
+            params = {"account_id": account_id, "limit": 20}
+            if cursor:
+                params["cursor"] = cursor
+
+            response = await unipile_service.request("GET", "/chats", params=params, timeout=60.0)
+            if response.status_code != 200:
+                raise Exception(f"Chats API error {response.status_code}: {response.text}")
+
+            data = response.json()
+            chats = data.get("items", [])
+            cursor = data.get("cursor")
+
+            for chat in chats:
+                listed += 1
+                yield chat
+
+            if not chats or not cursor:
+                break
+
+        print(f"💬 Found {listed} chats")
+
+    async def _iter_chat_messages(self, chat: Dict[str, Any], after: str = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Follow one chat's message cursor until its history (or everything after `after`) is exhausted"""
+        chat_id = chat["id"]
+        cursor = None
+
+        while True:
+            params = {"limit": self.linkedin_page_size}
+            if cursor:
+                params["cursor"] = cursor
+            if after:
+                params["after"] = after
+
+            res = await unipile_service.request("GET", f"/chats/{chat_id}/messages", account_id=chat.get("account_id"),
+                                                params=params, timeout=60.0)
+            if res.status_code != 200:
+                raise Exception(f"Failed to get messages for chat {chat_id}: {res.status_code}")
+
+            data = res.json()
+            chat_msgs = data.get("items", [])
+            cursor = data.get("cursor")
+
+            for msg in chat_msgs:
+                msg["chat_id"] = chat_id
+                msg["chat_info"] = chat
+
+            if chat_msgs:
+                yield chat_msgs
+
+            if not chat_msgs or not cursor:
+                break
+
+    async def _fetch_linkedin_chats_and_messages(self, account_id: str,
+                                                 chat_state: Dict[str, Any] = None) -> AsyncIterator[Any]:
+        """Yield (page, checkpoint) pairs of LinkedIn messages as they arrive, fetching many chats concurrently.
+
+        chat_state maps chat_id -> watermark; chats with nothing newer are skipped and
+        the others are only read back to their watermark. The checkpoint rides on an
+        empty page emitted after a chat has been drained completely. Chats that still
+        fail after retries are listed in the error raised once every other chat is done.
+        """
+        chat_state = chat_state or {}
+        semaphore = asyncio.Semaphore(self.linkedin_chat_concurrency)
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.linkedin_chat_concurrency * 2)
+        chat_tasks: List[asyncio.Task] = []
+        errors: List[Exception] = []
+        failed_chats: List[str] = []
+
+        async def drain_chat(chat: Dict[str, Any]):
+            watermark = chat_state.get(chat["id"], {}).get("newest_timestamp")
+            newest = watermark
+            last_external_id = chat_state.get(chat["id"], {}).get("last_external_id")
+
+            async with semaphore:
                 try:
-                    res = await client.get(f"{unipile_service.base_url}/chats/{chat_id}/messages", headers=headers, params={"limit": 100})
-                    if res.status_code == 200:
-                        chat_msgs = res.json().get("items", [])
-                        for msg in chat_msgs:
-                            msg["chat_id"] = chat_id
-                            msg["chat_info"] = chat
-                        all_messages.extend(chat_msgs)
-                        print(all_messages)
-                        # input('All messages fetched, press Enter to continue...')
-                        print(f"   ✅ Got {len(chat_msgs)} messages from chat {i+1}/{len(all_chats)}")
-                    else:
-                        print(f"   ❌ Failed to get messages: {res.status_code}")
+                    async for page in self._iter_chat_messages(chat, after=watermark):
+                        fresh = [msg for msg in page if not watermark or self._extract_timestamp(msg) > watermark]
+                        for msg in fresh:
+                            timestamp = self._extract_timestamp(msg)
+                            if not newest or timestamp > newest:
+                                newest, last_external_id = timestamp, msg.get("id")
+                        await pages.put((fresh, None))
+                        if len(fresh) < len(page):
+                            break
+                except UnipileUnavailable as e:
+                    # Unipile is down for every chat, not just this one: fail the import
+                    print(f"❌ Chat {chat.get('id')} error: {e}")
+                    errors.append(e)
+                    return
                 except Exception as e:
-                    print(f"❌ Chat {chat_id} error: {e}")
-                    continue
+                    # Not checkpointed, so the next run reads it again; the import must not end as completed
+                    print(f"❌ Chat {chat.get('id')} error: {e}")
+                    failed_chats.append(chat["id"])
+                    return
+
+            await pages.put(([], {
+                "phase": "chat",
+                "chat_id": chat["id"],
+                "newest": newest,
+                "last_external_id": last_external_id
+            }))
+
+        async def walk_chats():
+            try:
+                async for chat in self._iter_linkedin_chats(account_id):
+                    if not chat.get("id"):
+                        continue
+                    chat.setdefault("account_id", account_id)
+                    # Chats whose last activity is not newer than their watermark have nothing new
+                    watermark = chat_state.get(chat["id"], {}).get("newest_timestamp")
+                    if watermark and chat.get("timestamp") and chat["timestamp"] <= watermark:
+                        continue
+                    chat_tasks.append(asyncio.create_task(drain_chat(chat)))
+                await asyncio.gather(*chat_tasks)
+            except Exception as e:
+                print(f"❌ Error listing LinkedIn chats: {e}")
+                errors.append(e)
+                await asyncio.gather(*chat_tasks, return_exceptions=True)
+            await pages.put(None)
 
-        return all_messages
+        walker = asyncio.create_task(walk_chats())
+        try:
+            while True:
+                item = await pages.get()
+                if item is None:
+                    break
+                yield item
+            # Chats drained so far are checkpointed; the rest are picked up on the next run
+            if errors:
+                raise errors[0]
+            if failed_chats:
+                shown = ", ".join(failed_chats[:20]) + (" ..." if len(failed_chats) > 20 else "")
+                raise Exception(f"{len(failed_chats)} LinkedIn chats could not be read: {shown}")
+        finally:
+            for task in [walker, *chat_tasks]:
+                task.cancel()
+            await asyncio.gather(walker, *chat_tasks, return_exceptions=True)
 
     def _extract_linkedin_sender(self, raw_msg: Dict[str, Any]) -> str:
         is_sender = raw_msg.get("is_sender", 0)
@@ -320,41 +520,49 @@ class CompleteImportService:
         content = raw_msg.get("body_plain", "") or raw_msg.get("body", "")
         return content[:1000]
 
-    async def _store_all_messages(self, import_id: str, messages: List[Dict[str, Any]], account_id: str):
-        total = len(messages)
-        self.db.update_import_status(import_id, "processing", total=total)
-        stored = 0
+    def _contact_for_message(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """Sender identity used to resolve the message's person"""
+        sender = msg["sender"].strip()
+        if msg["channel"] == "email" and "@" in sender:
+            return {"email": sender, "name": self._extract_name_from_email(sender)}
+        return {"email": None, "name": sender}
+
+    async def _store_all_messages(self, import_id: str, messages: List[Dict[str, Any]], account_id: str,
+                                  processed_offset: int = 0, progress=None,
+                                  identities: IdentityCache = None) -> Dict[str, Any]:
+        """Store one batch of parsed messages; processed_offset is what earlier batches already handled"""
+        # Resolve every distinct sender once, then write messages in chunks.
+        # The blocking Supabase calls run on the database pool so fetching keeps going.
+        contacts = [self._contact_for_message(msg) for msg in messages]
+        person_ids = await self.db.resolve_people_bulk(contacts, cache=identities)
+
+        rows = []
         skipped = 0
-        people = set()
-
-        for i, msg in enumerate(messages):
-            try:
-                sender = msg["sender"].strip()
-                content = msg["content"].strip()
-                # if not content:
-                #     print(f"⚠️ Skipping message with empty content from {sender}")
-                #     skipped += 1
-                #     continue
-
-                if msg["channel"] == "email" and "@" in sender:
-                    pid = self.db.find_or_create_person(email=sender, name=self._extract_name_from_email(sender))
-                else:
-                    pid = self.db.find_or_create_person(email=None, name=sender)
-
-                self.db.store_message(msg, pid, account_id)
-                people.add(pid)
-                stored += 1
-
-                if stored % 10 == 0:
-                    self.db.update_import_status(import_id, "processing", processed=stored)
-
-            except Exception as e:
-                print(f"❌ Error storing message {i}: {e}")
+        for msg, contact in zip(messages, contacts):
+            pid = person_ids.get(self.db.person_key(contact["email"], contact["name"]))
+            if not pid:
+                print(f"⚠️ Skipping message from unresolved sender: {msg['sender']}")
                 skipped += 1
                 continue
-
-        self.db.update_import_status(import_id, "completed", processed=stored)
-        print(f"✅ IMPORT COMPLETE: {stored} stored, {skipped} skipped, {len(people)} people")
+            rows.append((msg, pid))
+
+        result = await self.db.store_messages_bulk(
+            rows,
+            account_id,
+            # Progress coalesces these into at most one status write per interval
+            callback=lambda handled: progress and progress.update(processed=processed_offset + handled)
+        )
+
+        for failure in result["failed_chunks"]:
+            print(f"❌ Chunk {failure['chunk']} failed ({failure['rows']} messages): {failure['error']}")
+
+        return {
+            "stored": result["stored"],
+            "duplicates": result["duplicates"],
+            "skipped": skipped + result["failed"],
+            "failed": result["failed"],
+            "people": {pid for _, pid in rows}
+        }
 
 
 # Global instance
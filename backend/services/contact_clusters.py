@@ -0,0 +1,157 @@
+# backend/services/contact_clusters.py
+
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from services.contact_grouping import ContactGrouper
+
+if TYPE_CHECKING:
+    from services.supabase_service import SupabaseService
+
+
+class ContactClusters:
+    """Keeps people.cluster_id up to date as people are created or changed.
+
+    The clusters are the contacts /api/people shows. Instead of regrouping the
+    whole people table on every read, each new person is grouped once, when it
+    is written, against a ContactGrouper restored from the saved cluster ids.
+    That grouper stays in memory. Once it is CONTACT_CLUSTERS_MAX_AGE seconds
+    old a fresh copy is read from the table on a background thread, so writes
+    from other workers are picked up without a write ever waiting for the
+    scan. Anyone found without a cluster on load is clustered and saved then.
+
+    Only cluster_id is ever written here, so name/email edits made after the
+    grouper was loaded are never overwritten.
+
+    Changing the threshold or the algorithm needs a full rebuild:
+        python -m services.contact_clusters
+    """
+
+    def __init__(self, max_age: float = None):
+        self.max_age = max_age or float(os.getenv("CONTACT_CLUSTERS_MAX_AGE", "300"))
+        self.grouper: Optional[ContactGrouper] = None
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh: Optional[threading.Thread] = None
+        self._changed_since_refresh: Dict[Any, Dict[str, Any]] = {}
+        self._moved_since_refresh = False
+
+    def assign(self, service: "SupabaseService", people: List[Dict[str, Any]], save: bool = True) -> Dict[Any, Any]:
+        """Cluster newly created people (full rows, in creation order); returns person id -> cluster id.
+
+        With save=False the caller writes cluster_id along with its own update.
+        """
+        with self._lock:
+            grouper = self._load(service)
+            # A fresh load already clustered rows that were in the table by then
+            known = {person['id']: grouper.groups[grouper.members[person['id']]]['id']
+                     for person in people if person['id'] in grouper.members}
+            assigned = {**known, **grouper.add([person for person in people if person['id'] not in known])}
+            self._track(people, assigned)
+            if save:
+                self._save(service, people, assigned)
+            return assigned
+
+    def reassign(self, service: "SupabaseService", person: Dict[str, Any]) -> Dict[Any, Any]:
+        """Re-cluster a person whose name or email changed.
+
+        They may now join (merge into) another cluster. If they founded their
+        cluster, its other members are clustered again too (a split); everyone
+        whose cluster changed is saved.
+        """
+        with self._lock:
+            grouper = self._load(service)
+            before = {member_id: grouper.groups[index]['id'] for member_id, index in grouper.members.items()}
+            rows = grouper.remove([person['id']]) + [person]
+            assigned = grouper.add(rows)
+            if self._refresh is not None:
+                # Existing members moved: the copy being read cannot replay that, so it is discarded
+                self._moved_since_refresh = True
+            self._save(service, [row for row in rows if before.get(row['id']) != assigned[row['id']]], assigned)
+            return assigned
+
+    def rebuild(self, service: "SupabaseService") -> Dict[str, int]:
+        """Regroup every person from scratch and save the cluster ids that changed"""
+        with self._lock:
+            people = service.select_all("people")
+            grouper = ContactGrouper()
+            assigned = grouper.add(people)
+            changed = [person for person in people if person.get("cluster_id") != assigned[person["id"]]]
+            self._save(service, changed, assigned)
+            self.grouper, self.loaded_at = grouper, time.monotonic()
+
+            clusters = len([group for group in grouper.groups if group])
+            print(f"🧩 Rebuilt {clusters} contact clusters from {len(people)} people ({len(changed)} changed)")
+            return {"people": len(people), "clusters": clusters, "changed": len(changed)}
+
+    def invalidate(self):
+        self.grouper = None
+
+    def _load(self, service: "SupabaseService") -> ContactGrouper:
+        """The grouper (call with the lock held); only the very first load scans inline"""
+        if self.grouper is None:
+            self.grouper, self.loaded_at = self._read(service), time.monotonic()
+        elif time.monotonic() - self.loaded_at > self.max_age and self._refresh is None:
+            self._changed_since_refresh, self._moved_since_refresh = {}, False
+            self._refresh = threading.Thread(target=self._reload, args=(service,), daemon=True,
+                                             name="contact-clusters-refresh")
+            self._refresh.start()
+        return self.grouper
+
+    def _reload(self, service: "SupabaseService"):
+        """Read a fresh grouper without the lock, then swap it in with the people clustered meanwhile"""
+        try:
+            grouper = self._read(service)
+            with self._lock:
+                if self.grouper is not None and not self._moved_since_refresh:
+                    grouper.restore(list(self._changed_since_refresh.values()))
+                    self.grouper, self.loaded_at = grouper, time.monotonic()
+        except Exception as e:
+            print(f"⚠️ Could not refresh contact clusters: {e}")
+        finally:
+            with self._lock:
+                self._refresh = None
+                self._changed_since_refresh = {}
+
+    def _read(self, service: "SupabaseService") -> ContactGrouper:
+        grouper = ContactGrouper()
+        unclustered = grouper.restore(service.select_all("people"))
+        if unclustered:
+            print(f"🧩 Clustering {len(unclustered)} people that have no cluster yet")
+            self._save(service, unclustered, grouper.add(unclustered))
+        return grouper
+
+    def _track(self, people: List[Dict[str, Any]], assigned: Dict[Any, Any]):
+        """Remember people clustered while a refresh is reading the table"""
+        if self._refresh is not None:
+            for person in people:
+                if person['id'] in assigned:
+                    self._changed_since_refresh[person['id']] = {**person, 'cluster_id': assigned[person['id']]}
+
+    @staticmethod
+    def _save(service: "SupabaseService", people: List[Dict[str, Any]], assigned: Dict[Any, Any],
+              chunk_size: int = 500):
+        """Write only cluster_id, one update per cluster, so newer name/email/merge edits are kept"""
+        by_cluster: Dict[Any, List[Any]] = {}
+        for person in people:
+            if person["id"] in assigned:
+                by_cluster.setdefault(assigned[person["id"]], []).append(person["id"])
+        for cluster_id, person_ids in by_cluster.items():
+            for start in range(0, len(person_ids), chunk_size):
+                service.supabase.table("people").update({"cluster_id": cluster_id}) \
+                    .in_("id", person_ids[start:start + chunk_size]).execute()
+
+
+# Global instance
+contact_clusters = ContactClusters()
+
+
+if __name__ == "__main__":
+    import dotenv
+
+    dotenv.load_dotenv()
+    from services.supabase_service import supabase_service
+
+    ContactClusters().rebuild(supabase_service)
@@ -0,0 +1,337 @@
+# backend/services/contact_grouping.py
+
+import os
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Two strings are the same contact when fuzz.ratio is above this
+MATCH_THRESHOLD = int(os.getenv("CONTACT_MATCH_THRESHOLD", "85"))
+
+
+def email_local_name(email: str) -> str:
+    """'john.smith@x.com' -> 'john smith'"""
+    return email.split('@')[0].replace('.', ' ').replace('_', ' ')
+
+
+class ContactGrouper:
+    """Groups people rows into contacts by fuzzy name and email matching.
+
+    The grouping rule is the one /api/people always used: each person joins the
+    first group (in creation order) whose name matches their name or
+    email-derived name, else the last group with an email matching their name;
+    otherwise they start a new group. Instead of comparing every person with
+    every group, all distinct names are first split into blocks that share a
+    rare character bigram, each block is scored at once with process.cdist,
+    and the grouping pass only looks up the pairs found.
+
+    The blocking is exact, not a heuristic: strings whose ratio is above the
+    threshold always share enough bigrams that they meet in a block (prefix
+    filtering on bigrams ordered by rarity), so the groups are identical to a
+    full pairwise scan.
+
+    A grouper keeps its groups, so people can be added later (or taken out
+    again) and are grouped exactly as if they had been in the first pass.
+    """
+
+    def __init__(self, threshold: int = None):
+        self.threshold = threshold or MATCH_THRESHOLD
+        self.groups: List[Optional[Dict[str, Any]]] = []    # None once dissolved
+        self.people: Dict[Any, Dict[str, Any]] = {}         # person id -> row
+        self.members: Dict[Any, int] = {}                   # person id -> group index
+        self.positions: Dict[str, int] = {}                 # group name -> its index
+        self.by_name: Dict[str, List[int]] = defaultdict(list)   # lowercased group name -> groups
+        self.by_email: Dict[str, List[int]] = defaultdict(list)  # lowercased email-derived name -> groups
+        self._min_common: Dict[int, int] = {}
+
+    def group(self, people: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Groups in creation order: id, name, email, emails and person_ids of each contact"""
+        self.add(people)
+        return [group for group in self.groups if group]
+
+    def add(self, people: Iterable[Dict[str, Any]]) -> Dict[Any, Any]:
+        """Put each person in a group, in order; returns person id -> group id"""
+        rows = [self._row(person) for person in people]
+
+        strings = {s for row in rows for s in self._strings(*row[1:])}
+        known = set(self.by_name) | set(self.by_email)
+        similar = self.similar(strings)
+        # Only people added later need comparing with the groups made so far
+        for s, matches in self.matches(strings, known - strings).items():
+            similar[s] |= matches
+
+        assigned = {}
+        for person, name, email, email_name in rows:
+            # The earliest group whose name matches, else the latest group whose emails match
+            # (the original scan stopped at a name match but kept going after an email match)
+            by_names = [index for match in similar[name.lower()] for index in self.by_name.get(match, ())]
+            if email_name:
+                by_names += [index for match in similar[email_name.lower()] for index in self.by_name.get(match, ())]
+            by_emails = [index for match in similar[name.lower()] for index in self.by_email.get(match, ())]
+
+            index = min(by_names) if by_names else max(by_emails) if by_emails else None
+            # A group named "" never counted as a match
+            if index is not None and self.groups[index]['name']:
+                self._join(index, person, email)
+            else:
+                index = self._found(person, name, email, email_name)
+
+            self.people[person['id']] = person
+            self.members[person['id']] = index
+            assigned[person['id']] = self.groups[index]['id']
+
+        return assigned
+
+    def restore(self, people: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rebuild the groups saved as people.cluster_id without matching anything again.
+
+        Each cluster is named after its founder (the person whose id is the
+        cluster id). May be called again with more rows: people already placed
+        are skipped and clusters that exist are joined. Returns the people that
+        have no cluster yet, for add().
+        """
+        clusters: Dict[Any, List[Dict[str, Any]]] = {}
+        unclustered = []
+        for person in people:
+            if person.get('cluster_id'):
+                clusters.setdefault(person['cluster_id'], []).append(person)
+            else:
+                unclustered.append(person)
+
+        for cluster_id, members in clusters.items():
+            members = [member for member in members if member['id'] not in self.members]
+            if not members:
+                continue
+            # Clusters already restored (rows restored in a later call) are joined, not founded again
+            index = self.members.get(cluster_id)
+            if index is None or not self.groups[index] or self.groups[index]['id'] != cluster_id:
+                members.sort(key=lambda member: member['id'] != cluster_id)  # founder first, rest in order
+                _, name, email, email_name = self._row(members[0])
+                index = self._found(members[0], name, email, email_name, group_id=cluster_id, replace=False)
+                founder = members[0]
+            else:
+                founder = None
+            for member in members:
+                if member is not founder:
+                    self._join(index, member, member.get('email', ''))
+                self.people[member['id']] = member
+                self.members[member['id']] = index
+
+        return unclustered
+
+    def remove(self, person_ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Take people out of their groups; returns the people left without a group.
+
+        A group is named after its first member, so when that member goes the
+        group is dissolved and its other members are returned to be add()ed
+        again, which may split them up.
+        """
+        person_ids = set(person_ids)
+        orphans = []
+        for person_id in person_ids:
+            person = self.people.pop(person_id, None)
+            index = self.members.pop(person_id, None)
+            if index is None or not self.groups[index]:
+                continue
+
+            group = self.groups[index]
+            group['person_ids'].remove(person_id)
+            if group['id'] == person_id:
+                self._dissolve(index)
+                for member_id in group['person_ids']:
+                    self.members.pop(member_id, None)
+                    orphans.append(self.people.pop(member_id))
+                continue
+
+            email = person.get('email')
+            if email and all(self.people[member_id].get('email') != email for member_id in group['person_ids']):
+                group['emails'].remove(email)
+                self.by_email[email_local_name(email).lower()].remove(index)
+                if group['email'] == email:
+                    group['email'] = group['emails'][0] if group['emails'] else ''
+
+        return [orphan for orphan in orphans if orphan['id'] not in person_ids]
+
+    def matches(self, queries: Iterable[str], candidates: Iterable[str]) -> Dict[str, Set[str]]:
+        """Each query mapped to the candidates it matches above the threshold (scored in length windows)"""
+        matches: Dict[str, Set[str]] = defaultdict(set)
+        queries = sorted(set(queries))
+        by_length: Dict[int, List[str]] = defaultdict(list)
+        for s in candidates:
+            by_length[len(s)].append(s)
+        if not queries or not by_length:
+            return matches
+
+        rows_by_length: Dict[int, List[str]] = defaultdict(list)
+        for s in queries:
+            rows_by_length[len(s)].append(s)
+        for length, rows in rows_by_length.items():
+            columns = [s for other, strings in by_length.items() if self._within_reach(length, other) for s in strings]
+            if not columns:
+                continue
+            scores = process.cdist(rows, columns, scorer=fuzz.ratio, score_cutoff=self.threshold)
+            for i, j in np.argwhere(scores > self.threshold):
+                matches[rows[i]].add(columns[j])
+        return matches
+
+    @staticmethod
+    def _row(person: Dict[str, Any]) -> Tuple[Dict[str, Any], str, str, str]:
+        name = person['name'].strip()
+        email = person.get('email', '')
+
+        # Extract name from email if person name is generic
+        email_name = ""
+        if email and "@" in email:
+            email_name = email_local_name(email).title()
+        return person, name, email, email_name
+
+    @staticmethod
+    def _strings(name: str, email: str, email_name: str) -> List[str]:
+        strings = [name.lower(), email_name.lower()]
+        if email:
+            strings.append(email_local_name(email).lower())
+        return strings
+
+    def _join(self, index: int, person: Dict[str, Any], email: str):
+        group = self.groups[index]
+        group['person_ids'].append(person['id'])
+        if email and email not in group['emails']:
+            group['emails'].append(email)
+            self.by_email[email_local_name(email).lower()].append(index)
+            # Update email if main entry doesn't have one
+            if not group['email']:
+                group['email'] = email
+
+    def _found(self, person: Dict[str, Any], name: str, email: str, email_name: str,
+               group_id: Any = None, replace: bool = True) -> int:
+        # Create new group - use the better name (not "You" or generic)
+        display_name = name
+        if name.lower() == "you" and email_name:
+            display_name = email_name
+
+        group = {
+            'id': group_id or person['id'],
+            'name': display_name,
+            'email': email,
+            'person_ids': [person['id']],
+            'emails': [email] if email else []
+        }
+        if replace and display_name in self.positions:
+            # Groups were keyed by name, so a second group of the same name replaced the first
+            index = self.positions[display_name]
+            for member_id in self.groups[index]['person_ids']:
+                self.members.pop(member_id, None)
+            for old_email in self.groups[index]['emails']:
+                self.by_email[email_local_name(old_email).lower()].remove(index)
+            self.groups[index] = group
+        else:
+            index = len(self.groups)
+            self.positions.setdefault(display_name, index)
+            self.by_name[display_name.lower()].append(index)
+            self.groups.append(group)
+        if email:
+            self.by_email[email_local_name(email).lower()].append(index)
+        return index
+
+    def _dissolve(self, index: int):
+        group = self.groups[index]
+        if self.positions.get(group['name']) == index:
+            del self.positions[group['name']]
+        self.by_name[group['name'].lower()].remove(index)
+        for email in group['emails']:
+            self.by_email[email_local_name(email).lower()].remove(index)
+        self.groups[index] = None
+
+    def similar(self, strings: Iterable[str]) -> Dict[str, Set[str]]:
+        """Every string mapped to the strings (itself included) it matches above the threshold"""
+        strings = sorted(set(strings))
+        similar: Dict[str, Set[str]] = {s: {s} for s in strings}
+
+        blocks, unblocked = self._blocks(strings)
+        # Strings too short to share a guaranteed bigram are scored against everything
+        pairs = [pair for block in blocks for pair in self._length_windows(block)]
+        if unblocked:
+            pairs.append((unblocked, strings))
+
+        for rows, columns in pairs:
+            scores = process.cdist(rows, columns, scorer=fuzz.ratio, score_cutoff=self.threshold)
+            for i, j in np.argwhere(scores > self.threshold):
+                similar[rows[i]].add(columns[j])
+                similar[columns[j]].add(rows[i])
+
+        return similar
+
+    def _blocks(self, strings: List[str]) -> Tuple[List[List[str]], List[str]]:
+        """Candidate blocks (strings sharing a bigram in their rarest-first prefixes), plus the unblockable strings.
+
+        A pair above the threshold shares at least min_common bigrams, so their
+        prefixes of len(grams) - min_common + 1 rarest bigrams must overlap.
+        Repeated bigrams are numbered so shared multiset counts work as sets.
+        """
+        grams = {s: self._bigrams(s) for s in strings}
+        frequency = Counter(gram for s in strings for gram in grams[s])
+
+        blocks: Dict[Tuple[str, int], List[str]] = defaultdict(list)
+        unblocked = []
+        for s in strings:
+            common = self.min_common(len(s))
+            if common < 1:
+                unblocked.append(s)
+                continue
+            ordered = sorted(grams[s], key=lambda gram: (frequency[gram], gram))
+            for gram in ordered[:len(ordered) - common + 1]:
+                blocks[gram].append(s)
+
+        return [block for block in blocks.values() if len(block) > 1], unblocked
+
+    def _length_windows(self, block: List[str]) -> List[Tuple[List[str], List[str]]]:
+        """Split a block into (strings of one length, strings long enough but not too long to match them)"""
+        by_length: Dict[int, List[str]] = defaultdict(list)
+        for s in block:
+            by_length[len(s)].append(s)
+
+        lengths = sorted(by_length)
+        windows = []
+        for length in lengths:
+            columns = [s for other in lengths if length <= other and self._within_reach(length, other)
+                       for s in by_length[other]]
+            if len(columns) > 1:
+                windows.append((by_length[length], columns))
+        return windows
+
+    def _within_reach(self, length: int, other: int) -> bool:
+        """Whether strings of these lengths can match at all (the length gap alone costs that many indels)"""
+        return 100 * abs(length - other) <= (100 - self.threshold) * (length + other)
+
+    def min_common(self, length: int) -> int:
+        """Fewest bigrams a string of this length shares with any string it matches.
+
+        Strings at ratio above the threshold have indel distance d with
+        d < (100 - threshold)% of their combined length, and every indel
+        destroys at most two shared bigrams. Boundary cases are counted as
+        matches, so float rounding in the scorer never loses a pair.
+        """
+        if length not in self._min_common:
+            slack = 100 - self.threshold
+            fewest: Optional[int] = None
+            other = 0
+            while 100 * (other - length) <= slack * (length + other):
+                distance = slack * (length + other) // 100
+                if distance >= abs(length - other):
+                    common = max(length, other) - 1 - 2 * distance
+                    fewest = common if fewest is None else min(fewest, common)
+                other += 1
+            self._min_common[length] = fewest if fewest is not None else 0
+        return self._min_common[length]
+
+    @staticmethod
+    def _bigrams(s: str) -> List[Tuple[str, int]]:
+        seen: Counter = Counter()
+        grams = []
+        for i in range(len(s) - 1):
+            gram = s[i:i + 2]
+            grams.append((gram, seen[gram]))
+            seen[gram] += 1
+        return grams
@@ -0,0 +1,46 @@
+# backend/services/identity_cache.py
+
+from typing import Dict, Optional, Tuple
+
+
+class IdentityCache:
+    """Per-import map from sender identity to merged person id.
+
+    Keys are the (kind, value) tuples from SupabaseService.person_key, so emails are
+    already normalized. Names are also kept on their own because a new email whose
+    name matches a known person links to that person.
+    """
+
+    def __init__(self):
+        self.people: Dict[Tuple[str, str], str] = {}
+        self.names: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        return email.strip().lower()
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        return " ".join(name.split())
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        person_id = self.people.get(key)
+        if person_id:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return person_id
+
+    def put(self, key: Tuple[str, str], person_id: str):
+        self.people[key] = person_id
+
+    def get_name(self, name: str) -> Optional[str]:
+        return self.names.get(self.normalize_name(name))
+
+    def put_name(self, name: str, person_id: str):
+        self.names.setdefault(self.normalize_name(name), person_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {"identities": len(self.people), "names": len(self.names), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,236 @@
+# backend/services/import_jobs.py
+
+import asyncio
+import itertools
+import os
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from services.complete_import_service import complete_import_service
+from services.async_supabase_service import async_supabase_service
+
+# Lower runs first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+# Finished jobs kept in memory for the status/jobs endpoints
+MAX_FINISHED_JOBS = 500
+
+
+class ImportJob:
+    """One queued or running account import"""
+
+    def __init__(self, import_id: str, account_id: str, provider: str, priority: int, full_resync: bool):
+        self.import_id = import_id
+        self.account_id = account_id
+        self.provider = provider
+        self.priority = priority
+        self.full_resync = full_resync
+        self.status = "queued"  # queued, running, paused, cancelled, completed, partial, failed
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, int]] = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "import_id": self.import_id,
+            "account_id": self.account_id,
+            "provider": self.provider,
+            "priority": self.priority,
+            "full_resync": self.full_resync,
+            "status": self.status,
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class ImportJobManager:
+    """Priority queue of account imports run by a pool of async workers.
+
+    At most one import per account runs at a time; later jobs for a busy account
+    wait until it frees up. Pausing cancels the running import and relies on the
+    import's sync checkpoints, so resuming continues where it stopped.
+    """
+
+    def __init__(self, workers: int = None):
+        self.worker_count = workers or int(os.getenv("IMPORT_WORKERS", "2"))
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.jobs: Dict[str, ImportJob] = {}
+        self.running_accounts = set()
+        self.deferred: Dict[str, deque] = {}
+        self.workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+
+    async def start(self):
+        """Start the worker pool (called from the app lifespan)"""
+        if self.workers:
+            return
+        self.queue = asyncio.PriorityQueue()
+        self.workers = [asyncio.create_task(self._worker(n)) for n in range(self.worker_count)]
+        print(f"👷 Started {self.worker_count} import workers")
+
+    async def stop(self):
+        """Cancel running imports and stop the workers"""
+        for job in self.jobs.values():
+            if job.task and not job.task.done():
+                job.task.cancel()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        print("👷 Import workers stopped")
+
+    async def enqueue(self, account_id: str, provider: str, priority: int = PRIORITY_NORMAL,
+                      full_resync: bool = False) -> str:
+        """Queue an import and return its import_id without waiting for it"""
+        # An import already waiting for this account covers the new request
+        for job in self.jobs.values():
+            if job.account_id == account_id and job.status == "queued" and not full_resync:
+                if priority < job.priority:
+                    job.priority = priority
+                    self._put(job)
+                print(f"📥 Import for {account_id} already queued: {job.import_id}")
+                return job.import_id
+
+        # Checked before the status row exists, so a refused job leaves no orphan "pending" import
+        self._ensure_running()
+        import_id = await async_supabase_service.create_import_status(account_id)
+        await async_supabase_service.update_import_status(import_id, "queued")
+
+        job = ImportJob(import_id, account_id, provider, priority, full_resync)
+        self.jobs[import_id] = job
+        self._put(job)
+        print(f"📥 Queued import {import_id} for {provider} account {account_id} (priority {priority})")
+        return import_id
+
+    def get_job(self, import_id: str) -> Optional[ImportJob]:
+        return self.jobs.get(import_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        return [job.to_dict() for job in self.jobs.values()]
+
+    async def cancel(self, import_id: str) -> Optional[ImportJob]:
+        """Cancel a queued or running import"""
+        return await self._stop_job(import_id, "cancelled")
+
+    async def pause(self, import_id: str) -> Optional[ImportJob]:
+        """Pause a queued or running import; resume() picks it up from its checkpoint"""
+        return await self._stop_job(import_id, "paused")
+
+    async def resume(self, import_id: str) -> Optional[ImportJob]:
+        """Put a paused import back on the queue"""
+        job = self.jobs.get(import_id)
+        if not job or job.status != "paused":
+            return job
+
+        job.status = "queued"
+        await async_supabase_service.update_import_status(import_id, "queued")
+        self._put(job)
+        print(f"▶️ Resumed import {import_id}")
+        return job
+
+    async def _stop_job(self, import_id: str, status: str) -> Optional[ImportJob]:
+        job = self.jobs.get(import_id)
+        if not job or job.status not in ("queued", "running"):
+            return job
+
+        was_running = job.status == "running"
+        job.status = status
+        if was_running and job.task:
+            # The worker records the final status once the task unwinds
+            job.task.cancel()
+        else:
+            job.finished_at = datetime.now().isoformat() if status == "cancelled" else None
+            await async_supabase_service.update_import_status(import_id, status)
+
+        print(f"⏹️ Import {import_id} {status}")
+        return job
+
+    def _ensure_running(self):
+        if self.queue is None:
+            raise Exception("Import workers are not running")
+
+    def _put(self, job: ImportJob):
+        self._ensure_running()
+        self.queue.put_nowait((job.priority, next(self._sequence), job.import_id))
+
+    async def _worker(self, number: int):
+        while True:
+            _, _, import_id = await self.queue.get()
+            try:
+                job = self.jobs.get(import_id)
+                if not job or job.status != "queued":
+                    continue
+
+                if job.account_id in self.running_accounts:
+                    deferred = self.deferred.setdefault(job.account_id, deque())
+                    if job not in deferred:
+                        deferred.append(job)
+                    continue
+
+                await self._run(job, number)
+            except Exception as e:
+                print(f"❌ Import worker {number} error: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: ImportJob, number: int):
+        self.running_accounts.add(job.account_id)
+        job.status = "running"
+        job.started_at = datetime.now().isoformat()
+        print(f"👷 Worker {number} running import {job.import_id} for {job.account_id}")
+
+        job.task = asyncio.create_task(complete_import_service.run_import(
+            job.import_id, job.account_id, job.provider, full_resync=job.full_resync
+        ))
+        try:
+            job.result = await job.task
+            if job.result and job.result.get("failed"):
+                job.status = "partial"
+                job.error = f"{job.result['failed']} messages could not be stored (retried on the next import)"
+            else:
+                job.status = "completed"
+        except asyncio.CancelledError:
+            if job.status not in ("cancelled", "paused"):
+                # The worker itself is shutting down
+                job.status = "cancelled"
+                raise
+            await async_supabase_service.update_import_status(job.import_id, job.status)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.task = None
+            if job.status != "paused":
+                job.finished_at = datetime.now().isoformat()
+            self.running_accounts.discard(job.account_id)
+            self._release_account(job.account_id)
+            self._prune()
+
+    def _release_account(self, account_id: str):
+        """Requeue the next job that was waiting for this account"""
+        deferred = self.deferred.get(account_id)
+        while deferred:
+            job = deferred.popleft()
+            if job.status == "queued":
+                self._put(job)
+                break
+        if not deferred:
+            self.deferred.pop(account_id, None)
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.status in ("completed", "partial", "failed", "cancelled")]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self.jobs.pop(job.import_id, None)
+
+
+# Global instance
+import_job_manager = ImportJobManager()
@@ -0,0 +1,196 @@
+# backend/services/import_pipeline.py
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class StageStats:
+    """Counters for one pipeline stage: queue depth, throughput and latency"""
+
+    def __init__(self, name: str, queue: Optional[asyncio.Queue] = None):
+        self.name = name
+        self.queue = queue  # Queue feeding this stage (None for the source)
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.max_latency = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+    def finish(self):
+        self.finished_at = time.monotonic()
+
+    def record(self, items: int, seconds: float):
+        self.items += items
+        self.batches += 1
+        self.busy_seconds += seconds
+        self.max_latency = max(self.max_latency, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+
+        return {
+            "stage": self.name,
+            "queue_depth": self.queue.qsize() if self.queue is not None else None,
+            "queue_capacity": self.queue.maxsize if self.queue is not None else None,
+            "items": self.items,
+            "batches": self.batches,
+            "throughput_per_sec": round(self.items / elapsed, 2) if elapsed > 0 else 0.0,
+            "avg_latency_ms": round(self.busy_seconds / self.batches * 1000, 2) if self.batches else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+            "running": self.started_at is not None and self.finished_at is None
+        }
+
+
+_DONE = object()
+
+
+class ImportPipeline:
+    """Fetch -> parse -> write stages joined by bounded queues.
+
+    The source yields raw pages, parse turns one raw item into a message (or None
+    to drop it) and write persists a batch and returns how many rows it stored.
+    Bounded queues give backpressure: a slow writer pauses fetching instead of
+    letting pages pile up in memory.
+
+    A source may also yield (page, token) tuples. Once every message of that page
+    has been written, checkpoint(token) is awaited, in source order, so callers
+    can persist a resume point that never runs ahead of the database.
+    """
+
+    def __init__(self, source: AsyncIterator[Any],
+                 parse: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+                 write: Callable[[List[Dict[str, Any]]], Awaitable[int]],
+                 queue_size: int = 4, batch_size: int = 500,
+                 checkpoint: Callable[[Any], Awaitable[None]] = None):
+        self.source = source
+        self.parse = parse
+        self.write = write
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+
+        self.raw_pages: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.parsed_pages: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+        self.stages = {
+            "fetch": StageStats("fetch"),
+            "parse": StageStats("parse", self.raw_pages),
+            "write": StageStats("write", self.parsed_pages)
+        }
+        self.stored = 0
+        self.source_error: Optional[BaseException] = None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Current counters for every stage"""
+        return {name: stage.snapshot() for name, stage in self.stages.items()}
+
+    async def run(self) -> Dict[str, Dict[str, Any]]:
+        """Run all stages to completion and return the final stats"""
+        tasks = [
+            asyncio.create_task(self._fetch_stage()),
+            asyncio.create_task(self._parse_stage()),
+            asyncio.create_task(self._write_stage())
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            aclose = getattr(self.source, "aclose", None)
+            if aclose:
+                await aclose()
+
+        # Pages fetched before a source failure are still written and checkpointed
+        if self.source_error:
+            raise self.source_error
+
+        return self.stats()
+
+    async def _fetch_stage(self):
+        stats = self.stages["fetch"]
+        stats.start()
+        waited_from = time.monotonic()
+
+        try:
+            async for item in self.source:
+                page, token = item if isinstance(item, tuple) else (item, None)
+                stats.record(len(page), time.monotonic() - waited_from)
+                await self.raw_pages.put((page, token))
+                waited_from = time.monotonic()
+        except Exception as e:
+            self.source_error = e
+
+        stats.finish()
+        await self.raw_pages.put(_DONE)
+
+    async def _parse_stage(self):
+        stats = self.stages["parse"]
+        stats.start()
+
+        while True:
+            item = await self.raw_pages.get()
+            if item is _DONE:
+                break
+
+            page, token = item
+            began = time.monotonic()
+            parsed = [message for message in map(self.parse, page) if message]
+            stats.record(len(parsed), time.monotonic() - began)
+
+            # Empty pages still travel on when they carry a checkpoint
+            if parsed or token is not None:
+                await self.parsed_pages.put((parsed, token))
+
+        stats.finish()
+        await self.parsed_pages.put(_DONE)
+
+    async def _write_stage(self):
+        stats = self.stages["write"]
+        stats.start()
+        batch: List[Dict[str, Any]] = []
+        pending = deque()  # [unwritten message count, token] per page, in source order
+
+        while True:
+            item = await self.parsed_pages.get()
+            done = item is _DONE
+            if not done:
+                page, token = item
+                batch.extend(page)
+                pending.append([len(page), token])
+
+            while len(batch) >= self.batch_size or (done and batch):
+                chunk, batch = batch[:self.batch_size], batch[self.batch_size:]
+                began = time.monotonic()
+                self.stored += await self.write(chunk)
+                stats.record(len(chunk), time.monotonic() - began)
+                await self._settle(pending, len(chunk))
+
+            await self._settle(pending, 0)
+            if done:
+                break
+
+        stats.finish()
+
+    async def _settle(self, pending: deque, written: int):
+        """Mark written messages against their pages and checkpoint every page now fully stored"""
+        while pending:
+            entry = pending[0]
+            consumed = min(entry[0], written)
+            entry[0] -= consumed
+            written -= consumed
+            if entry[0]:
+                break
+
+            pending.popleft()
+            if entry[1] is not None and self.checkpoint:
+                await self.checkpoint(entry[1])
@@ -0,0 +1,166 @@
+# backend/services/import_progress.py
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from services.async_supabase_service import async_supabase_service
+from services.supabase_service import supabase_service
+
+# Seconds of history used for the messages/sec rate
+RATE_WINDOW_SECONDS = 10.0
+
+
+class ImportProgress:
+    """Progress of one live import, written to import_status at most once per interval.
+
+    Updates land in memory immediately; the database only sees the latest values
+    when the interval has passed or the stage changes. Safe to call from the
+    worker threads that run the bulk writes; on the event loop the write is
+    handed to the database pool instead of blocking.
+    """
+
+    def __init__(self, import_id: str, account_id: str, provider: str, interval: float):
+        self.import_id = import_id
+        self.account_id = account_id
+        self.provider = provider
+        self.interval = interval
+        self.stage = "starting"
+        self.total = 0
+        self.processed = 0
+        self.total_final = False
+        self.started_at = datetime.now().isoformat()
+        self.extra: Dict[str, Callable[[], Any]] = {}
+
+        self._lock = threading.Lock()
+        # Held across read + write so the last write to land always carries the latest values
+        self._write_lock = threading.Lock()
+        self.closed = False
+        self._began = time.monotonic()
+        self._samples = deque([(self._began, 0)])
+        self._last_write = 0.0
+        self._dirty = False
+        self.writes = 0
+
+    def set_stage(self, stage: str):
+        with self._lock:
+            changed = stage != self.stage
+            self.stage = stage
+            self._dirty = True
+        if changed:
+            self.flush(force=True)
+
+    def update(self, processed: int = None, total: int = None, total_final: bool = None):
+        with self._lock:
+            if processed is not None:
+                self.processed = processed
+                now = time.monotonic()
+                self._samples.append((now, processed))
+                while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW_SECONDS:
+                    self._samples.popleft()
+            if total is not None:
+                self.total = max(total, self.processed)
+            if total_final is not None:
+                self.total_final = total_final
+            self._dirty = True
+        self.flush()
+
+    def rate(self) -> float:
+        """Messages per second over the recent window"""
+        with self._lock:
+            (first_at, first), (last_at, last) = self._samples[0], self._samples[-1]
+        elapsed = last_at - first_at
+        return (last - first) / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self) -> Optional[float]:
+        """None until the total is known; before that it only counts what has been fetched so far"""
+        rate = self.rate()
+        if not rate or not self.total or not self.total_final:
+            return None
+        return round(max(self.total - self.processed, 0) / rate, 1)
+
+    def flush(self, force: bool = False):
+        """Write the latest values if the interval has passed (or force is set)"""
+        with self._lock:
+            now = time.monotonic()
+            if not self._dirty or (not force and now - self._last_write < self.interval):
+                return
+            self._dirty = False
+            self._last_write = now
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.write()
+        else:
+            loop.run_in_executor(async_supabase_service.executor, self.write)
+
+    def write(self, status: str = None):
+        """Write the current values (blocking); a status closes the progress for good"""
+        with self._write_lock:
+            if self.closed:
+                return
+            with self._lock:
+                stage, total, processed = self.stage, self.total, self.processed
+
+            supabase_service.update_import_status(self.import_id, status or stage, total=total, processed=processed)
+            self.writes += 1
+            if status:
+                self.closed = True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Status payload served straight from memory"""
+        snapshot = {
+            "id": self.import_id,
+            "account_id": self.account_id,
+            "provider": self.provider,
+            "status": self.stage,
+            "total_messages": self.total,
+            "processed_messages": self.processed,
+            "total_is_final": self.total_final,
+            "messages_per_second": round(self.rate(), 2),
+            "eta_seconds": self.eta_seconds(),
+            "elapsed_seconds": round(time.monotonic() - self._began, 1),
+            "started_at": self.started_at,
+            "live": True
+        }
+        for key, provider in self.extra.items():
+            value = provider()
+            if value is not None:
+                snapshot[key] = value
+        return snapshot
+
+
+class ImportProgressRegistry:
+    """In-memory progress for the imports running in this process"""
+
+    def __init__(self):
+        self.interval = float(os.getenv("IMPORT_PROGRESS_INTERVAL", "1.0"))
+        self.live: Dict[str, ImportProgress] = {}
+
+    def start(self, import_id: str, account_id: str, provider: str) -> ImportProgress:
+        progress = ImportProgress(import_id, account_id, provider, self.interval)
+        self.live[import_id] = progress
+        return progress
+
+    def get(self, import_id: str) -> Optional[ImportProgress]:
+        return self.live.get(import_id)
+
+    async def finish(self, import_id: str, status: str = None):
+        """Write the final state and stop serving this import from memory"""
+        progress = self.live.pop(import_id, None)
+        if not progress:
+            return
+
+        # Without a status the latest stage is written and the job manager records the outcome
+        await async_supabase_service.run(progress.write, status or progress.stage)
+        print(f"📊 Import {import_id}: {progress.processed} messages, "
+              f"{progress.writes} status writes, {progress.rate():.1f} msg/s at the end")
+
+
+# Global instance
+import_progress = ImportProgressRegistry()
@@ -0,0 +1,94 @@
+# backend/services/linkedin_filter_resolver.py
+
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.param_id_cache import ParamIdCache
+from services.unipile_linkedin_service import UnipileClient
+
+# Filters whose comma-separated values are looked up as parameter ids: filter -> parameter type
+ID_FILTERS = {
+    "location": "LOCATION",
+    "industry": "INDUSTRY",
+    "company": "COMPANY",
+    "past_company": "COMPANY",
+    "school": "SCHOOL",
+    "service": "SERVICE"
+}
+
+# Filters passed through as lists of strings (no ID lookup needed)
+LIST_FILTERS = ["profile_language", "connections_of", "followers_of", "open_to"]
+
+
+class LinkedInFilterResolver:
+    """Turns human-readable people-search filters into the search_filters Unipile expects.
+
+    Every parameter lookup the filters need is collected first, deduplicated by
+    (type, normalized keyword) so e.g. the same company in company and
+    past_company is looked up once, and then run concurrently. Resolving takes
+    about as long as the slowest lookup instead of the sum of all of them.
+    """
+
+    def __init__(self, client: UnipileClient, concurrency: int = None):
+        self.client = client
+        self.concurrency = concurrency or int(os.getenv("LINKEDIN_PARAM_CONCURRENCY", "6"))
+
+    async def resolve(self, filters: Dict[str, str]) -> Dict[str, Any]:
+        filters = filters or {}
+        search_filters: Dict[str, Any] = {}
+
+        # Map human-readable filters to LinkedIn IDs
+        wanted = {
+            name: [value.strip() for value in filters[name].split(",") if value.strip()]
+            for name in ID_FILTERS if filters.get(name)
+        }
+        ids = await self._lookup_all({
+            ParamIdCache.key(ID_FILTERS[name], value): (ID_FILTERS[name], value)
+            for name, values in wanted.items() for value in values
+        })
+        for name, values in wanted.items():
+            resolved = [ids[ParamIdCache.key(ID_FILTERS[name], value)] for value in values]
+            resolved = [param_id for param_id in resolved if param_id]
+            if resolved:
+                search_filters[name] = resolved
+
+        # Direct string/array filters (no ID lookup needed)
+        if filters.get("keywords"):
+            search_filters["keywords"] = filters["keywords"]
+
+        for name in LIST_FILTERS:
+            if filters.get(name):
+                search_filters[name] = [value.strip() for value in filters[name].split(",")]
+
+        if filters.get("network_distance"):
+            distances = [int(dist.strip()) for dist in filters["network_distance"].split(",") if dist.strip().isdigit()]
+            if distances:
+                search_filters["network_distance"] = distances
+
+        # Advanced keywords (if provided as a single field with structured format)
+        if filters.get("advanced_keywords"):
+            # Expecting format like "first_name:John,last_name:Doe,title:Engineer"
+            advanced = {}
+            for pair in filters["advanced_keywords"].split(","):
+                if ":" in pair:
+                    key, value = pair.split(":", 1)
+                    advanced[key.strip()] = value.strip()
+            if advanced:
+                search_filters["advanced_keywords"] = advanced
+
+        return search_filters
+
+    async def _lookup_all(self, lookups: Dict[Tuple[str, str], Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[str]]:
+        """Run the distinct lookups concurrently, at most `concurrency` at a time"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def lookup(param_type: str, keyword: str) -> Optional[str]:
+            async with semaphore:
+                return await self.client.get_param_id(param_type, keyword)
+
+        keys: List[Tuple[str, str]] = list(lookups)
+        if keys:
+            print(f"🔎 Resolving {len(keys)} filter values")
+        results = await asyncio.gather(*(lookup(*lookups[key]) for key in keys))
+        return dict(zip(keys, results))
@@ -0,0 +1,179 @@
+# backend/services/linkedin_people_stream.py
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from services.profile_cache import profile_cache
+from services.unipile_linkedin_service import UnipileClient
+from services.unipile_resilience import UnipileUnavailable, deadline_scope, no_deadline
+
+
+class SearchPagePrefetcher:
+    """Search pages fetched ahead of time, parked until a request asks for their cursor.
+
+    While one page streams, the next is already being fetched. If the stream
+    ends first (max_results reached, client gone), that fetch is parked here
+    under (account, filters, page size, cursor), so the frontend's "next page"
+    request picks it up instead of waiting on Unipile. Parked pages expire after
+    LINKEDIN_PREFETCH_TTL seconds; at most LINKEDIN_PREFETCH_SIZE are kept.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = max_entries or int(os.getenv("LINKEDIN_PREFETCH_SIZE", "32"))
+        self.ttl = ttl or float(os.getenv("LINKEDIN_PREFETCH_TTL", "120"))
+        self.pages: "OrderedDict[str, Tuple[float, asyncio.Task]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(client: UnipileClient, filters: Dict[str, Any], count: int, cursor: Optional[str]) -> str:
+        return json.dumps([client.account_id, filters, count, cursor], sort_keys=True)
+
+    def fetch(self, client: UnipileClient, filters: Dict[str, Any], count: int, cursor: Optional[str],
+              background: bool = False, budget: Optional[float] = None) -> asyncio.Task:
+        """The parked fetch for this page if there is a usable one, else a new fetch.
+
+        Fetches never run under the current request's deadline: a stream outlives
+        it, and background fetches may be picked up by a later request. Foreground
+        fetches get their own `budget` instead.
+        """
+        self._expire()
+        entry = self.pages.pop(self.key(client, filters, count, cursor), None) if cursor else None
+        if entry and not self._failed(entry[1]):
+            self.hits += 1
+            print(f"⚡ Using prefetched search page ({len(self.pages)} still parked)")
+            return entry[1]
+
+        self.misses += 1
+        with no_deadline(), deadline_scope(None if background else budget):
+            return asyncio.create_task(client.search_page(filters, count, cursor))
+
+    def park(self, client: UnipileClient, filters: Dict[str, Any], count: int, cursor: str, task: asyncio.Task):
+        """Keep an unused fetch around for the request that asks for this cursor next"""
+        if self._failed(task):
+            return
+        self.pages[self.key(client, filters, count, cursor)] = (time.monotonic() + self.ttl, task)
+        while len(self.pages) > self.max_entries:
+            _, (_, evicted) = self.pages.popitem(last=False)
+            self._drop(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {"parked": len(self.pages), "hits": self.hits, "misses": self.misses}
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self.pages.items() if expires_at <= now]:
+            self._drop(self.pages.pop(key)[1])
+
+    @staticmethod
+    def _failed(task: asyncio.Task) -> bool:
+        return task.done() and (task.cancelled() or task.exception() is not None)
+
+    @staticmethod
+    def _drop(task: asyncio.Task):
+        if task.done():
+            if not task.cancelled():
+                task.exception()  # retrieved, so a failed prefetch is not logged as unhandled
+        else:
+            task.cancel()
+
+
+class LinkedInPeopleStream:
+    """People search that yields each result as soon as it is ready.
+
+    Events (one dict each, sent as NDJSON by the route):
+      {"type": "result", "index": n, "result": {...}}   - in completion order when enriching
+      {"type": "done", "count": n, "cursor": "..."}     - cursor of the next page, or None
+      {"type": "error", "detail": "...", "count": n, "cursor": "..."} - cursor to retry from
+
+    With include_details, result events also carry "details": "found", "missing"
+    or "skipped" (plus "detail" with the reason when Unipile could not be asked).
+
+    A stream runs long past the inbound request's deadline, so every page fetch
+    and every profile lookup gets its own budget of LINKEDIN_STREAM_ITEM_SECONDS.
+    """
+
+    def __init__(self, client: UnipileClient, prefetcher: SearchPagePrefetcher = None, item_budget: float = None):
+        self.client = client
+        self.prefetcher = prefetcher or search_prefetcher
+        self.item_budget = item_budget or float(os.getenv("LINKEDIN_STREAM_ITEM_SECONDS", "25"))
+
+    async def stream(self, filters: Dict[str, Any], max_results: int = 40, count: int = 50,
+                     include_details: bool = False, cursor: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        page_size = max(1, min(count, max_results))
+        sent = 0
+        page: Optional[asyncio.Task] = self.prefetcher.fetch(self.client, filters, page_size, cursor,
+                                                             budget=self.item_budget)
+        upcoming: Optional[Tuple[int, str, asyncio.Task]] = None
+
+        try:
+            while page is not None:
+                try:
+                    items, next_cursor = await page
+                except Exception as e:
+                    print(f"❌ People search page failed: {e}")
+                    yield {"type": "error", "detail": str(e), "count": sent, "cursor": cursor}
+                    return
+                page = None
+
+                items = items[:max_results - sent]
+                remaining = max_results - sent - len(items)
+                if next_cursor:
+                    # Fetched while this page streams: used below if this search needs more,
+                    # otherwise parked for the frontend's next-page request
+                    next_size = min(count, remaining) if remaining > 0 else page_size
+                    upcoming = (next_size, next_cursor,
+                                self.prefetcher.fetch(self.client, filters, next_size, next_cursor, background=True))
+
+                async for index, event in self._results(items, include_details):
+                    yield {"type": "result", "index": sent + index, **event}
+                sent += len(items)
+                cursor = next_cursor
+
+                if remaining > 0 and upcoming:
+                    page, upcoming = upcoming[2], None
+
+            yield {"type": "done", "count": sent, "cursor": cursor}
+        finally:
+            if page is not None:
+                page.cancel()
+            if upcoming:
+                self.prefetcher.park(self.client, filters, upcoming[0], upcoming[1], upcoming[2])
+
+    async def _results(self, people: List[Dict[str, Any]], include_details: bool) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """(position, event fields) for a page, each as soon as its details are in"""
+        if not include_details:
+            for index, person in enumerate(people):
+                yield index, {"result": person}
+            return
+
+        semaphore = asyncio.Semaphore(self.client.details_concurrency)
+
+        async def enrich(index: int, person: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    with deadline_scope(self.item_budget):
+                        profile_details = await self.client.find_profile_details(person)
+                except UnipileUnavailable as e:
+                    print(f"⚠️ Skipping details for {person.get('name')}: {e}")
+                    return index, {"result": person, "details": "skipped", "detail": str(e)}
+                return index, {"result": self.client.merge_profile(person, profile_details),
+                               "details": "found" if profile_details else "missing"}
+
+        # Outside the request's deadline; each lookup sets its own budget once it has a slot
+        with no_deadline():
+            tasks = [asyncio.create_task(enrich(index, person)) for index, person in enumerate(people)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.to_thread(profile_cache.persist)
+
+# Global instance
+search_prefetcher = SearchPagePrefetcher()
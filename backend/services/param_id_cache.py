@@ -0,0 +1,122 @@
+# backend/services/param_id_cache.py
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+# Returned by get() when nothing usable is cached (None is a cached "no such parameter")
+MISSING = object()
+
+
+class ParamIdCache:
+    """Two-level cache for LinkedIn search parameter ids (e.g. LOCATION "Berlin" -> id).
+
+    An in-process LRU sits in front of a SQLite file, so ids survive restarts and
+    are shared by every worker on the host. Keys are (TYPE, normalized keyword).
+    Lookups that found nothing are cached too, with a shorter TTL, so a typo is
+    not looked up again on every search.
+
+    Memory hits are answered inline; SQLite is only touched from worker threads
+    so lookups never block the event loop.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, ttl: float = None, negative_ttl: float = None):
+        self.path = path or os.getenv("PARAM_ID_CACHE_PATH", "linkedin_param_ids.sqlite3")
+        self.max_entries = max_entries or int(os.getenv("PARAM_ID_CACHE_SIZE", "2048"))
+        self.ttl = ttl or float(os.getenv("PARAM_ID_CACHE_TTL", str(30 * 24 * 3600)))
+        self.negative_ttl = negative_ttl or float(os.getenv("PARAM_ID_CACHE_NEGATIVE_TTL", str(24 * 3600)))
+
+        self.memory: "OrderedDict[Tuple[str, str], Tuple[Optional[str], float]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # guards memory and the counters
+        self._db_lock = threading.Lock()  # serializes use of the shared SQLite connection
+        self._db: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def key(param_type: str, keyword: str) -> Tuple[str, str]:
+        return param_type.strip().upper(), " ".join(keyword.split()).casefold()
+
+    async def get(self, param_type: str, keyword: str) -> Any:
+        """The cached id, None for a cached "not found", or MISSING"""
+        key = self.key(param_type, keyword)
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry and entry[1] > now:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        entry = await asyncio.to_thread(self._read, key, now)
+        with self._lock:
+            if entry:
+                self._remember(key, entry)
+                self.disk_hits += 1
+                return entry[0]
+
+            self.memory.pop(key, None)
+            self.misses += 1
+            return MISSING
+
+    async def put(self, param_type: str, keyword: str, param_id: Optional[str]):
+        """Cache a lookup result; None records that the keyword has no id"""
+        key = self.key(param_type, keyword)
+        entry = (param_id, time.time() + (self.ttl if param_id else self.negative_ttl))
+        with self._lock:
+            self._remember(key, entry)
+        await asyncio.to_thread(self._write, key, entry)
+
+    def stats(self) -> dict:
+        return {"entries": len(self.memory), "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def _remember(self, key: Tuple[str, str], entry: Tuple[Optional[str], float]):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _read(self, key: Tuple[str, str], now: float) -> Optional[Tuple[Optional[str], float]]:
+        try:
+            with self._db_lock:
+                row = self._connect().execute(
+                    "SELECT param_id, expires_at FROM param_ids WHERE param_type = ? AND keyword = ? AND expires_at > ?",
+                    (key[0], key[1], now)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Param id cache unreadable: {e}")
+            return None
+        return (row[0], row[1]) if row else None
+
+    def _write(self, key: Tuple[str, str], entry: Tuple[Optional[str], float]):
+        try:
+            with self._db_lock:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO param_ids (param_type, keyword, param_id, expires_at) VALUES (?, ?, ?, ?)",
+                    (key[0], key[1], entry[0], entry[1])
+                )
+                db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not persist param id {key}: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS param_ids ("
+                "param_type TEXT NOT NULL, keyword TEXT NOT NULL, param_id TEXT, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (param_type, keyword))"
+            )
+            self._db.commit()
+        return self._db
+
+
+# Global instance
+param_id_cache = ParamIdCache()
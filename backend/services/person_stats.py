@@ -0,0 +1,34 @@
+# backend/services/person_stats.py
+
+from supabase import Client
+
+
+class PersonStats:
+    """The person_stats rollup (migrations 005 and 007).
+
+    A trigger on messages adds every inserted row in the same transaction as
+    the insert, so the rollup cannot drift from messages and duplicates skipped
+    by the upsert are never counted. Rebuilding recomputes it from messages,
+    e.g. after editing messages by hand:
+        python -m services.person_stats
+    """
+
+    def rebuild(self, db: Client) -> int:
+        """Recompute the whole rollup from messages; safe to run at any time"""
+        result = db.rpc("rebuild_person_stats").execute()
+        rows = result.data or 0
+        print(f"📊 Rebuilt person_stats: {rows} people with messages")
+        return rows
+
+
+# Global instance
+person_stats = PersonStats()
+
+
+if __name__ == "__main__":
+    import dotenv
+
+    dotenv.load_dotenv()
+    from services.supabase_service import supabase_service
+
+    PersonStats().rebuild(supabase_service.supabase)
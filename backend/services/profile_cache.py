@@ -0,0 +1,182 @@
+# backend/services/profile_cache.py
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Profile fields that identify the same person across lookups
+IDENTIFIER_FIELDS = ("public_identifier", "provider_id", "id", "member_urn")
+
+
+class ProfileCache:
+    """LinkedIn profile details from /users/{identifier}, cached in memory and on disk.
+
+    A profile is stored once under a canonical key (its provider id, else its
+    public identifier) and every identifier it is known by points to it, so a
+    profile fetched by public_identifier is also found by provider id. Memory is
+    an LRU of PROFILE_CACHE_SIZE profiles; the SQLite file keeps zlib-compressed
+    JSON, is trimmed to PROFILE_CACHE_DISK_SIZE profiles and survives restarts.
+
+    Memory is guarded by its own lock, so the event loop never waits behind a
+    disk write; SQLite is only read and written from worker threads.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, max_disk_entries: int = None, ttl: float = None):
+        self.path = path or os.getenv("PROFILE_CACHE_PATH", "linkedin_profiles.sqlite3")
+        self.max_entries = max_entries or int(os.getenv("PROFILE_CACHE_SIZE", "2000"))
+        self.max_disk_entries = max_disk_entries or int(os.getenv("PROFILE_CACHE_DISK_SIZE", "50000"))
+        self.ttl = ttl or float(os.getenv("PROFILE_CACHE_TTL", str(7 * 24 * 3600)))
+
+        self.memory: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.aliases: Dict[str, str] = {}
+        self.names: Dict[str, List[str]] = {}
+        self.pending: Dict[str, Tuple[Dict[str, Any], float, List[str]]] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # guards memory, aliases, pending and the counters
+        self._db_lock = threading.Lock()  # serializes use of the shared SQLite connection
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_rows = 0  # upper bound on rows on disk; the file is trimmed once it passes the limit
+
+    @staticmethod
+    def identifiers(profile: Dict[str, Any], *extra: Optional[str]) -> List[str]:
+        found = [profile.get(field) for field in IDENTIFIER_FIELDS] + list(extra)
+        return list(dict.fromkeys(str(identifier) for identifier in found if identifier))
+
+    async def get_any(self, identifiers: Iterable[Optional[str]]) -> Optional[Dict[str, Any]]:
+        """The cached, unexpired profile for the first identifier that has one"""
+        identifiers = [str(identifier) for identifier in identifiers if identifier]
+        now = time.time()
+        with self._lock:
+            for identifier in identifiers:
+                key = self.aliases.get(identifier)
+                entry = self.memory.get(key) if key else None
+                if entry and entry[1] > now:
+                    self.memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+
+        found = await asyncio.to_thread(self._read_any, identifiers, now)
+        with self._lock:
+            if found:
+                identifier, (key, profile, expires_at) = found
+                self._remember(key, profile, expires_at, self.identifiers(profile, identifier))
+                self.disk_hits += 1
+                return profile
+
+            self.misses += 1
+            return None
+
+    def put(self, profile: Dict[str, Any], *identifiers: Optional[str]):
+        """Cache a fetched profile under its own identifiers plus the ones it was looked up by.
+
+        Only memory is updated here; persist() writes everything new to disk in
+        one transaction.
+        """
+        names = self.identifiers(profile, *identifiers)
+        if not names:
+            return
+        key = str(profile.get("provider_id") or profile.get("public_identifier") or names[0])
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, profile, expires_at, names)
+            self.pending[key] = (profile, expires_at, names)
+
+    def persist(self):
+        """Write pending profiles to disk (blocking; run it off the event loop)"""
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        try:
+            with self._db_lock:
+                db = self._connect()
+                with db:
+                    for key, (profile, expires_at, names) in pending.items():
+                        db.execute(
+                            "INSERT OR REPLACE INTO profiles (key, data, expires_at) VALUES (?, ?, ?)",
+                            (key, zlib.compress(json.dumps(profile).encode()), expires_at)
+                        )
+                        db.executemany(
+                            "INSERT OR REPLACE INTO profile_aliases (identifier, key) VALUES (?, ?)",
+                            [(name, key) for name in names]
+                        )
+                    self._disk_rows += len(pending)
+                    if self._disk_rows > self.max_disk_entries:
+                        self._trim(db)
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not persist {len(pending)} profiles: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.memory), "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def _remember(self, key: str, profile: Dict[str, Any], expires_at: float, names: List[str]):
+        self.memory[key] = (profile, expires_at)
+        self.memory.move_to_end(key)
+        self.names[key] = list(dict.fromkeys(self.names.get(key, []) + names))
+        for name in names:
+            self.aliases[name] = key
+        while len(self.memory) > self.max_entries:
+            evicted, _ = self.memory.popitem(last=False)
+            for name in self.names.pop(evicted, []):
+                if self.aliases.get(name) == evicted:
+                    del self.aliases[name]
+
+    def _read_any(self, identifiers: List[str], now: float) -> Optional[Tuple[str, Tuple[str, Dict[str, Any], float]]]:
+        """(identifier, row) for the first identifier found on disk (blocking)"""
+        for identifier in identifiers:
+            row = self._read(identifier, now)
+            if row:
+                return identifier, row
+        return None
+
+    def _read(self, identifier: str, now: float) -> Optional[Tuple[str, Dict[str, Any], float]]:
+        try:
+            with self._db_lock:
+                row = self._connect().execute(
+                    "SELECT p.key, p.data, p.expires_at FROM profile_aliases a JOIN profiles p ON p.key = a.key "
+                    "WHERE a.identifier = ? AND p.expires_at > ?",
+                    (identifier, now)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Profile cache unreadable: {e}")
+            return None
+        if not row:
+            return None
+        return row[0], json.loads(zlib.decompress(row[1])), row[2]
+
+    def _trim(self, db: sqlite3.Connection):
+        """Drop expired profiles, then the oldest ones beyond max_disk_entries"""
+        db.execute("DELETE FROM profiles WHERE expires_at <= ?", (time.time(),))
+        db.execute(
+            "DELETE FROM profiles WHERE key IN (SELECT key FROM profiles ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+        db.execute("DELETE FROM profile_aliases WHERE key NOT IN (SELECT key FROM profiles)")
+        self._disk_rows = db.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS profiles (key TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS profiles_expires_at ON profiles (expires_at)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS profile_aliases (identifier TEXT PRIMARY KEY, key TEXT NOT NULL)"
+            )
+            self._db.commit()
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+        return self._db
+
+
+# Global instance
+profile_cache = ProfileCache()
@@ -0,0 +1,114 @@
+# backend/services/search_result_cache.py
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from services.unipile_resilience import no_deadline
+
+# Filters whose free text LinkedIn matches case-insensitively
+TEXT_FILTERS = ("keywords", "advanced_keywords")
+
+
+class SearchResultCache:
+    """Short-lived cache of LinkedIn people-search results, with stale-while-revalidate.
+
+    Keys are a canonical form of the resolved search filters (dict keys and
+    list values sorted, whitespace collapsed, free text casefolded) plus the
+    result window, so the same search typed slightly differently shares one
+    entry. Entries are fresh for SEARCH_CACHE_TTL seconds; after that and up to
+    SEARCH_CACHE_STALE_TTL they are still served at once while a background
+    search replaces them. Concurrent misses for one key share a single search.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None, stale_ttl: float = None):
+        self.max_entries = max_entries or int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+        self.ttl = ttl or float(os.getenv("SEARCH_CACHE_TTL", "300"))
+        self.stale_ttl = stale_ttl or float(os.getenv("SEARCH_CACHE_STALE_TTL", "1800"))
+
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.fetches: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def canonical(cls, value: Any, text: bool = False) -> Any:
+        if isinstance(value, dict):
+            return {str(k): cls.canonical(v, text or k in TEXT_FILTERS) for k, v in sorted(value.items())}
+        if isinstance(value, (list, tuple)):
+            items = [cls.canonical(item, text) for item in value]
+            return sorted(items, key=lambda item: json.dumps(item, sort_keys=True))
+        if isinstance(value, str):
+            value = " ".join(value.split())
+            return value.casefold() if text else value
+        return value
+
+    def key(self, account_id: Optional[str], filters: Dict[str, Any], max_results: int, cursor: Optional[str] = None) -> str:
+        return json.dumps(
+            {"account": account_id, "filters": self.canonical(filters), "window": [cursor, max_results]},
+            sort_keys=True
+        )
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Tuple[Any, Dict[str, Any]]:
+        """(results, cache info) - from memory when fresh or stale, else from fetch()"""
+        entry = self.entries.get(key)
+        if entry:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], {"hit": True, "stale": False, "age_seconds": round(age, 1)}
+            if age < self.stale_ttl:
+                self.entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self.fetches:
+                    print(f"♻️ Serving stale search results ({round(age)}s old) while refreshing")
+                    self._start_fetch(key, fetch, background=True)
+                return entry[1], {"hit": True, "stale": True, "age_seconds": round(age, 1)}
+
+        self.misses += 1
+        task = self.fetches.get(key) or self._start_fetch(key, fetch)
+        # Shielded so one caller going away does not cancel the search for the others
+        return await asyncio.shield(task), {"hit": False, "stale": False, "age_seconds": 0}
+
+    def invalidate(self):
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses}
+
+    def _start_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]], background: bool = False) -> asyncio.Task:
+        if background:
+            # A revalidation outlives the request that triggered it
+            with no_deadline():
+                task = asyncio.create_task(self._fetch(key, fetch))
+        else:
+            task = asyncio.create_task(self._fetch(key, fetch))
+        # Nobody may be waiting on it, so mark its exception as handled (it is logged in _fetch)
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.fetches[key] = task
+        return task
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            results = await fetch()
+            self.entries[key] = (time.monotonic(), results)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return results
+        except Exception as e:
+            # A stale entry keeps serving until it runs out
+            print(f"⚠️ LinkedIn search for the result cache failed: {e}")
+            raise
+        finally:
+            if self.fetches.get(key) is asyncio.current_task():
+                self.fetches.pop(key, None)
+
+
+# Global instance
+search_result_cache = SearchResultCache()
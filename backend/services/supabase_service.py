@@ -1,8 +1,21 @@
+import base64
+import json
 import os
 from supabase import create_client, Client
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from datetime import datetime
-from rapidfuzz import fuzz, process
+from rapidfuzz import fuzz
+from services.contact_clusters import contact_clusters
+from services.contact_grouping import ContactGrouper
+from services.identity_cache import IdentityCache
+
+# Columns the person timeline returns
+TIMELINE_COLUMNS = "id, person_id, account_id, channel, sender, recipient, subject, content, timestamp, external_id, thread_id"
+
+
+class MissingMigration(Exception):
+    """A query needs a view or table from a migration that has not been applied"""
+
 
 class SupabaseService:
     def __init__(self):
@@ -13,6 +26,10 @@ class SupabaseService:
             raise Exception("Missing Supabase credentials")
 
         self.supabase: Client = create_client(url, key)
+        # Rows per PostgREST request on the bulk write paths
+        self.bulk_chunk_size = int(os.getenv("SUPABASE_BULK_CHUNK_SIZE", "500"))
+        # Values per in_() filter; lookups are GETs, so the list has to fit in the URL
+        self.lookup_chunk_size = int(os.getenv("SUPABASE_LOOKUP_CHUNK_SIZE", "100"))
         print("✅ Supabase client initialized")
 
     def get_all_people(self) -> List[Dict[str, Any]]:
@@ -28,19 +45,39 @@ class SupabaseService:
             return result.data
 
     # Message operations
+    def _message_row(self, message_data: Dict[str, Any], person_id: str, account_id: str) -> Dict[str, Any]:
+        """Build a messages table row from a parsed message"""
+        return {
+            "person_id": person_id,
+            "account_id": account_id,
+            "channel": message_data.get("channel", "email"),
+            "sender": message_data.get("sender", ""),
+            "recipient": message_data.get("recipient", ""),
+            "subject": message_data.get("subject", ""),
+            "content": message_data.get("content", ""),
+            "timestamp": message_data.get("timestamp", datetime.now().isoformat()),
+            # Empty ids become NULL so they never collide on the unique key
+            "external_id": message_data.get("external_id") or None,
+            "thread_id": message_data.get("thread_id") or None
+        }
+
     def store_message(self, message_data: Dict[str, Any], person_id: str, account_id: str) -> str:
-        """Store a single message"""
+        """Store a single message; a message already stored under the same external_id is a no-op"""
         try:
-            result = self.supabase.table("messages").insert({
-                "person_id": person_id,
-                "account_id": account_id,
-                "channel": message_data.get("channel", "email"),
-                "sender": message_data.get("sender", ""),
-                "recipient": message_data.get("recipient", ""),
-                "subject": message_data.get("subject", ""),
-                "content": message_data.get("content", ""),
-                "timestamp": message_data.get("timestamp", datetime.now().isoformat())
-            }).execute()
+            row = self._message_row(message_data, person_id, account_id)
+            result = self.supabase.table("messages").upsert(
+                row,
+                on_conflict="account_id,external_id",
+                ignore_duplicates=True
+            ).execute()
+
+            if not result.data:
+                existing = self.supabase.table("messages").select("id") \
+                    .eq("account_id", account_id) \
+                    .eq("external_id", row["external_id"]) \
+                    .execute()
+                print(f"♻️ Message already stored: {row['external_id']}")
+                return existing.data[0]["id"]
 
             message_id = result.data[0]["id"]
             print(f"💬 Stored message: {message_data.get('subject', 'No subject')}")
@@ -50,6 +87,55 @@ class SupabaseService:
             print(f"❌ Error storing message: {e}")
             raise e
 
+    def store_messages_bulk(self, messages: List[Tuple[Dict[str, Any], str]], account_id: str,
+                            chunk_size: int = None, callback: Callable[[int], None] = None) -> Dict[str, Any]:
+        """Store (message, person_id) pairs in chunked upserts, reporting failed chunks.
+
+        Rows whose (account_id, external_id) is already stored are skipped and counted
+        as duplicates; callback receives the number of rows handled so far.
+        """
+        rows = []
+        seen = set()
+        duplicates = 0
+        for message_data, person_id in messages:
+            row = self._message_row(message_data, person_id, account_id)
+            if row["external_id"]:
+                if row["external_id"] in seen:
+                    duplicates += 1
+                    continue
+                seen.add(row["external_id"])
+            rows.append(row)
+
+        stored = 0
+        handled = duplicates
+        failed_chunks = []
+
+        for index, chunk in self._chunks(rows, chunk_size):
+            try:
+                result = self.supabase.table("messages").upsert(
+                    chunk,
+                    on_conflict="account_id,external_id",
+                    ignore_duplicates=True
+                ).execute()
+                inserted = len(result.data or [])
+                stored += inserted
+                duplicates += len(chunk) - inserted
+                handled += len(chunk)
+                print(f"💬 Stored message chunk {index + 1}: {inserted} new, {len(chunk) - inserted} already stored")
+            except Exception as e:
+                print(f"❌ Error storing message chunk {index + 1}: {e}")
+                failed_chunks.append({"chunk": index, "rows": len(chunk), "error": str(e)})
+
+            if callback:
+                callback(handled)
+
+        return {
+            "stored": stored,
+            "duplicates": duplicates,
+            "failed": sum(chunk["rows"] for chunk in failed_chunks),
+            "failed_chunks": failed_chunks
+        }
+
     # Import status operations
     def create_import_status(self, account_id: str) -> str:
         """Create import status record"""
@@ -78,7 +164,7 @@ class SupabaseService:
             if processed is not None:
                 update_data["processed_messages"] = processed
 
-            if status == "completed":
+            if status in ("completed", "partial"):
                 update_data["completed_at"] = datetime.now().isoformat()
 
             self.supabase.table("import_status").update(update_data).eq("id", import_id).execute()
@@ -96,6 +182,28 @@ class SupabaseService:
             print(f"❌ Error getting import status: {e}")
             return None
 
+    # Sync state operations
+    def get_sync_state(self, account_id: str) -> Optional[Dict[str, Any]]:
+        """Get the persisted sync watermarks for an account"""
+        try:
+            result = self.supabase.table("sync_state").select("*").eq("account_id", account_id).execute()
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"❌ Error getting sync state: {e}")
+            return None
+
+    def save_sync_state(self, account_id: str, state: Dict[str, Any]):
+        """Upsert the sync watermarks for an account"""
+        try:
+            self.supabase.table("sync_state").upsert({
+                **state,
+                "account_id": account_id,
+                "updated_at": datetime.now().isoformat()
+            }, on_conflict="account_id").execute()
+        except Exception as e:
+            print(f"❌ Error saving sync state: {e}")
+            raise e
+
 
     # def find_or_create_person(self, email: str = None, name: str = None) -> str:
     #     """Find existing person or create new one - handles both email and LinkedIn"""
@@ -173,12 +281,19 @@ class SupabaseService:
                     known_person = result.data[0]
                     known_id = known_person["merged_person_id"] or known_person["id"]
 
-                    # Create new person linked to known merged_person_id
+                    # A name-only contact is the known person; a new row would only add a
+                    # duplicate on every repeat (e.g. a redelivered webhook)
+                    if not email:
+                        print(f"👤 Found person by name: {name} → merged_id: {known_id}")
+                        return known_id
+
+                    # Create new person (with the email we had not seen) linked to known merged_person_id
                     insert_result = self.supabase.table("people").insert({
                         "name": name,
                         "email": email,
                         "merged_person_id": known_id
                     }).execute()
+                    self._assign_clusters(insert_result.data or [])
 
                     print(f"👤 Linked new person to existing name match: {name} → merged_id: {known_id}")
                     return known_id
@@ -193,10 +308,12 @@ class SupabaseService:
             }).execute()
 
             new_id = new_result.data[0]["id"]
+            clusters = self._assign_clusters(new_result.data, save=False)
 
-            # Set their own merged_person_id
+            # Set their own merged_person_id (and the contact cluster they start or join)
             self.supabase.table("people").update({
-                "merged_person_id": new_id
+                "merged_person_id": new_id,
+                "cluster_id": clusters.get(new_id)
             }).eq("id", new_id).execute()
 
             print(f"👤 Created new standalone person: {name or email} → merged_id: {new_id}")
@@ -206,6 +323,186 @@ class SupabaseService:
             print(f"❌ Error in find_or_create_person: {e}")
             raise e
 
+    def update_person(self, person_id: str, name: str = None, email: str = None) -> Optional[Dict[str, Any]]:
+        """Change a person's name and/or email and move them to the contact cluster that now fits"""
+        changes = {key: value for key, value in (("name", name), ("email", email)) if value is not None}
+        if not changes:
+            return None
+        try:
+            result = self.supabase.table("people").update(changes).eq("id", person_id).execute()
+            if not result.data:
+                print(f"❌ Person {person_id} not found")
+                return None
+
+            person = result.data[0]
+            person["cluster_id"] = contact_clusters.reassign(self, person).get(person_id)
+            print(f"👤 Updated person {person_id} → cluster {person['cluster_id']}")
+            return person
+        except Exception as e:
+            print(f"❌ Error updating person {person_id}: {e}")
+            raise e
+
+    def _assign_clusters(self, people: List[Dict[str, Any]], save: bool = True) -> Dict[str, str]:
+        """Contact cluster for newly created people; a failure leaves them for the next cluster load"""
+        if not people:
+            return {}
+        try:
+            return contact_clusters.assign(self, people, save=save)
+        except Exception as e:
+            print(f"⚠️ Could not cluster {len(people)} new people: {e}")
+            contact_clusters.invalidate()
+            return {}
+
+    # Bulk people operations
+    def _chunks(self, rows: List[Any], chunk_size: int = None):
+        """Yield (index, chunk) pairs of at most chunk_size rows"""
+        size = chunk_size or self.bulk_chunk_size
+        for start in range(0, len(rows), size):
+            yield start // size, rows[start:start + size]
+
+    @staticmethod
+    def person_key(email: str = None, name: str = None) -> Optional[Tuple[str, str]]:
+        """Identity key used by the bulk resolver: normalized email when present, otherwise name"""
+        if email and "@" in email:
+            return ("email", IdentityCache.normalize_email(email))
+        if name and name.strip():
+            return ("name", IdentityCache.normalize_name(name))
+        return None
+
+    def resolve_people_bulk(self, contacts: List[Dict[str, Optional[str]]], chunk_size: int = None,
+                            cache: IdentityCache = None) -> Dict[Tuple[str, str], str]:
+        """Resolve many {email, name} contacts to merged person ids, creating missing people in bulk.
+
+        Follows the same rules as find_or_create_person: an email match wins, then a
+        name match links the contact to the known person, otherwise a new standalone
+        person is created. Returns a mapping of person_key -> merged person id; contacts
+        whose create chunk failed are left out of the mapping. A failed lookup raises
+        instead: without it, people who already exist would be created again.
+
+        With an IdentityCache, identities resolved by earlier batches of the same import
+        skip the database entirely and only unseen senders are looked up.
+        """
+        cache = cache or IdentityCache()
+        pending = {}
+        resolved = {}
+        for contact in contacts:
+            key = self.person_key(contact.get("email"), contact.get("name"))
+            if not key or key in pending or key in resolved:
+                continue
+            cached_id = cache.get(key)
+            if cached_id:
+                resolved[key] = cached_id
+            else:
+                pending[key] = contact
+
+        # 1. Email matches for the unseen senders in one pass
+        emails = list({variant for key, contact in pending.items() if key[0] == "email"
+                       for variant in (contact["email"].strip(), key[1])})
+        for index, chunk in self._chunks(emails, self.lookup_chunk_size):
+            try:
+                result = self.supabase.table("people").select("id, merged_person_id, email").in_("email", chunk).execute()
+            except Exception as e:
+                print(f"❌ Error resolving people email chunk {index + 1}: {e}")
+                raise
+            for person in result.data or []:
+                key = ("email", IdentityCache.normalize_email(person["email"]))
+                if key in pending:
+                    resolved.setdefault(key, person["merged_person_id"] or person["id"])
+
+        # 2. Name matches for whatever is still unresolved and not already known by name
+        name_matches = {}
+        names = set()
+        for key, contact in pending.items():
+            if key in resolved or not contact.get("name"):
+                continue
+            name = contact["name"].strip()
+            cached_id = cache.get_name(name)
+            if cached_id:
+                name_matches[name] = cached_id
+            else:
+                names.add(name)
+
+        for index, chunk in self._chunks(list(names), self.lookup_chunk_size):
+            try:
+                result = self.supabase.table("people").select("id, merged_person_id, name").in_("name", chunk).execute()
+            except Exception as e:
+                print(f"❌ Error resolving people name chunk {index + 1}: {e}")
+                raise
+            for person in result.data or []:
+                name_matches.setdefault(person["name"], person["merged_person_id"] or person["id"])
+
+        # 3. Split the rest into new standalone people and rows linked to a known person
+        standalone = {}  # name -> (key, row)
+        links = []  # (key, row, name of the person it links to)
+        for key, contact in pending.items():
+            if key in resolved:
+                continue
+
+            email = contact.get("email").strip() if key[0] == "email" else None
+            name = contact.get("name").strip() if contact.get("name") else None
+            if not name and email:
+                name = email.split('@')[0].replace('.', ' ').title()
+
+            if name in name_matches:
+                resolved[key] = name_matches[name]
+                if email:
+                    links.append((key, {"name": name, "email": email, "merged_person_id": name_matches[name]}, None))
+            elif name in standalone:
+                links.append((key, {"name": name, "email": email}, name))
+            else:
+                standalone[name] = (key, {"name": name, "email": email})
+
+        new_people = list(standalone.values())
+        for index, chunk in self._chunks(new_people, chunk_size):
+            try:
+                result = self.supabase.table("people").insert([row for _, row in chunk]).execute()
+                created = result.data or []
+                clusters = self._assign_clusters(created, save=False)
+
+                # Self-link merged_person_id (and store the contact cluster) for the whole chunk in one upsert
+                self.supabase.table("people").upsert([
+                    {"id": person["id"], "name": person["name"], "email": person.get("email"),
+                     "merged_person_id": person["id"], "cluster_id": clusters.get(person["id"])}
+                    for person in created
+                ]).execute()
+
+                # PostgREST does not promise input order; standalone names are unique within a batch
+                keys = {(row["name"], row["email"]): key for key, row in chunk}
+                for person in created:
+                    key = keys.get((person["name"], person.get("email")))
+                    if key:
+                        resolved[key] = person["id"]
+                        name_matches[person["name"]] = person["id"]
+                print(f"👤 Created {len(created)} new people (chunk {index + 1})")
+            except Exception as e:
+                print(f"❌ Error creating people chunk {index + 1}: {e}")
+
+        link_rows = []
+        for key, row, linked_name in links:
+            if linked_name is not None:
+                if linked_name not in name_matches:
+                    continue
+                row["merged_person_id"] = name_matches[linked_name]
+                resolved[key] = row["merged_person_id"]
+                if not row["email"]:
+                    continue
+            link_rows.append(row)
+
+        for index, chunk in self._chunks(link_rows, chunk_size):
+            try:
+                result = self.supabase.table("people").insert(chunk).execute()
+                self._assign_clusters(result.data or [])
+            except Exception as e:
+                print(f"❌ Error linking people chunk {index + 1}: {e}")
+
+        for key, person_id in resolved.items():
+            cache.put(key, person_id)
+        for name, person_id in name_matches.items():
+            cache.put_name(name, person_id)
+
+        print(f"👥 Resolved {len(resolved)} distinct senders ({len(pending)} looked up, {len(standalone)} new)")
+        return resolved
+
     # def get_all_people_with_stats(self):
     #     """Get all people with message counts and latest message info"""
     #     try:
@@ -252,86 +549,31 @@ class SupabaseService:
         """Get all people grouped by name (with fuzzy matching) with message counts"""
         try:
             # Get all people first
-            people_result = self.supabase.table('people').select('*').execute()
-
-            # Group people by similar names using fuzzy matching
-            grouped_people = {}
-            name_to_group = {}  # Maps names to their group key
-
-            for person in people_result.data or []:
-                name = person['name'].strip()
-                email = person.get('email', '')
-
-                # Extract name from email if person name is generic
-                email_name = ""
-                if email and "@" in email:
-                    email_name = email.split('@')[0].replace('.', ' ').replace('_', ' ').title()
-
-                # Find if this person matches any existing group
-                matched_group = None
-
-                # Check against existing groups
-                for group_name in grouped_people.keys():
-                    # Direct name match
-                    if fuzz.ratio(name.lower(), group_name.lower()) > 85:
-                        matched_group = group_name
-                        break
-
-                    # Check if name matches email-derived name
-                    if email_name and fuzz.ratio(email_name.lower(), group_name.lower()) > 85:
-                        matched_group = group_name
-                        break
-
-                    # Check if any email in the group matches this person's name
-                    for group_email in grouped_people[group_name]['emails']:
-                        if group_email:
-                            group_email_name = group_email.split('@')[0].replace('.', ' ').replace('_', ' ')
-                            if fuzz.ratio(name.lower(), group_email_name.lower()) > 85:
-                                matched_group = group_name
-                                break
-
-                if matched_group:
-                    # Add to existing group
-                    grouped_people[matched_group]['person_ids'].append(person['id'])
-                    if email and email not in grouped_people[matched_group]['emails']:
-                        grouped_people[matched_group]['emails'].append(email)
-                        # Update email if main entry doesn't have one
-                        if not grouped_people[matched_group]['email']:
-                            grouped_people[matched_group]['email'] = email
-                else:
-                    # Create new group - use the better name (not "You" or generic)
-                    display_name = name
-                    if name.lower() == "you" and email_name:
-                        display_name = email_name
-
-                    grouped_people[display_name] = {
-                        'id': person['id'],
-                        'name': display_name,
-                        'email': email,
-                        'person_ids': [person['id']],
-                        'emails': [email] if email else [],
-                        'message_count': 0,
-                        'last_message_date': None,
-                        'channels': set()
-                    }
-                    name_to_group[name] = display_name
-
-            # Now get message stats for each grouped person
+            all_people = self.select_all('people')
+
+            # Group people by their stored contact cluster; anyone not clustered yet
+            # (e.g. before the first rebuild) is matched against those clusters here
+            grouper = ContactGrouper()
+            unclustered = grouper.restore(all_people)
+            if unclustered:
+                print(f"⚠️ {len(unclustered)} people have no cluster yet, grouping them on the fly "
+                      f"(run `python -m services.contact_clusters` to store them)")
+            grouped_people = grouper.group(unclustered)
+
+            # Message stats for every contact in one query, then combined per group
+            stats = self._contact_message_stats()
             people = []
 
-            for group_name, person_data in grouped_people.items():
-                # Get messages for ALL person IDs in this group
-                messages_result = self.supabase.table('messages') \
-                    .select('id, channel, timestamp') \
-                    .in_('person_id', person_data['person_ids']) \
-                    .execute()
-
-                messages = messages_result.data or []
+            for person_data in grouped_people:
+                # A clustered group is one stats row; people grouped on the fly add their own
+                contact_ids = {grouper.people[pid].get('cluster_id') or pid for pid in person_data['person_ids']}
+                rows = [stats[contact_id] for contact_id in contact_ids if contact_id in stats]
 
                 # Calculate stats
-                message_count = len(messages)
-                channels = list(set([m['channel'] for m in messages])) if messages else []
-                last_message_date = max([m['timestamp'] for m in messages]) if messages else None
+                message_count = sum(row['message_count'] for row in rows)
+                channels = list({channel for row in rows for channel in row['channels'] or []})
+                last_message_date = max((row['last_message_date'] for row in rows if row['last_message_date']),
+                                        default=None)
 
                 people.append({
                     'id': person_data['id'],
@@ -347,12 +589,37 @@ class SupabaseService:
             # Sort by last message date (most recent first)
             people.sort(key=lambda x: x['last_message_date'] or '', reverse=True)
 
-            print(f"✅ Grouped {len(people_result.data)} people into {len(people)} unique contacts")
+            print(f"✅ Grouped {len(all_people)} people into {len(people)} unique contacts")
             return people
 
+        except MissingMigration:
+            raise
         except Exception as e:
             print(f"❌ Error getting grouped people with stats: {e}")
             return []
+
+    def _contact_message_stats(self) -> Dict[str, Dict[str, Any]]:
+        """contact id (cluster id, or person id if unclustered) -> message_count, last_message_date, channels"""
+        try:
+            rows = self.select_all('contact_message_stats', order='contact_id')
+        except Exception as e:
+            # Aggregating every message here would be the per-message transfer the view replaces
+            raise MissingMigration(
+                "contact_message_stats view is missing; apply backend/migrations/004_contact_message_stats.sql "
+                f"and 005_person_stats.sql ({e})"
+            ) from e
+        return {row['contact_id']: row for row in rows}
+
+    def select_all(self, table: str, columns: str = '*', order: str = 'id', page_size: int = 1000) -> List[Dict[str, Any]]:
+        """Every row of a table or view, paged so PostgREST's row cap cannot truncate it"""
+        rows: List[Dict[str, Any]] = []
+        while True:
+            page = (self.supabase.table(table).select(columns).order(order)
+                    .range(len(rows), len(rows) + page_size - 1).execute().data or [])
+            if not page:
+                return rows
+            rows.extend(page)
+
     # def get_messages_by_person(self, person_id: str):
     #     """Get all messages for a specific person"""
     #     try:
@@ -369,66 +636,32 @@ class SupabaseService:
     #     except Exception as e:
     #         print(f"❌ Error getting messages for person {person_id}: {e}")
     #         return []
-    def get_messages_by_person(self, person_id: str):
-        """Get all messages for a person and their similar names"""
-        try:
-            from rapidfuzz import fuzz
+    def get_messages_by_person(self, person_id: str, limit: int = None, cursor: str = None):
+        """Messages for a person and everyone in their contact cluster, newest first.
 
-            # Get the main person's info
-            person_result = self.supabase.table('people') \
-                .select('name, email') \
-                .eq('id', person_id) \
-                .execute()
-
-            if not person_result.data:
+        With a limit, pass timeline_cursor() of the last page as cursor to get the
+        next one. Raises ValueError for a malformed cursor.
+        """
+        after = self.decode_timeline_cursor(cursor) if cursor else None
+        try:
+            person_ids = self._cluster_person_ids(person_id)
+            if not person_ids:
                 print(f"❌ Person {person_id} not found")
                 return []
 
-            main_person = person_result.data[0]
-            main_name = main_person['name'].strip().lower()
-            main_email = main_person.get('email', '')
-
-            # Extract name from email
-            email_name = ""
-            if main_email and "@" in main_email:
-                email_name = main_email.split('@')[0].replace('.', ' ').replace('_', ' ').lower()
+            print(f"📧 Found {len(person_ids)} related person records for {person_id}")
 
-            # Get all people and find similar ones
-            all_people = self.supabase.table('people').select('id, name, email').execute()
-            similar_person_ids = [person_id]  # Include the original person
-
-            for person in all_people.data or []:
-                if person['id'] == person_id:
-                    continue
-
-                person_name = person['name'].strip().lower()
-                person_email = person.get('email', '')
-
-                # Check name similarity
-                if fuzz.ratio(main_name, person_name) > 85:
-                    similar_person_ids.append(person['id'])
-                    continue
-
-                # Check if main name matches person's email
-                if person_email and "@" in person_email:
-                    person_email_name = person_email.split('@')[0].replace('.', ' ').replace('_', ' ').lower()
-                    if fuzz.ratio(main_name, person_email_name) > 85:
-                        similar_person_ids.append(person['id'])
-                        continue
-
-                # Check if person name matches main email
-                if email_name and fuzz.ratio(person_name, email_name) > 85:
-                    similar_person_ids.append(person['id'])
-                    continue
-
-            print(f"📧 Found {len(similar_person_ids)} related person records for {main_person['name']}")
-
-            # Get messages for all similar person IDs
-            result = self.supabase.table('messages') \
-                .select('*') \
-                .in_('person_id', similar_person_ids) \
+            query = self.supabase.table('messages') \
+                .select(TIMELINE_COLUMNS) \
+                .in_('person_id', person_ids) \
                 .order('timestamp', desc=True) \
-                .execute()
+                .order('id', desc=True)
+            if after:
+                timestamp, message_id = self._quoted(after[0]), self._quoted(after[1])
+                query = query.or_(f"timestamp.lt.{timestamp},and(timestamp.eq.{timestamp},id.lt.{message_id})")
+            if limit:
+                query = query.limit(limit)
+            result = query.execute()
 
             messages = result.data or []
             print(f"✅ Retrieved {len(messages)} messages across all related contacts")
@@ -438,6 +671,95 @@ class SupabaseService:
             print(f"❌ Error getting messages for person {person_id}: {e}")
             return []
 
+    @staticmethod
+    def timeline_cursor(messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Cursor for the page after these messages"""
+        if not messages:
+            return None
+        last = messages[-1]
+        return base64.urlsafe_b64encode(json.dumps([last['timestamp'], last['id']]).encode()).decode()
+
+    @staticmethod
+    def decode_timeline_cursor(cursor: str) -> Tuple[str, Any]:
+        try:
+            timestamp, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return str(timestamp), message_id
+        except Exception:
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    @staticmethod
+    def _quoted(value: Any) -> str:
+        """A value quoted for a PostgREST or= filter"""
+        return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+    def _cluster_person_ids(self, person_id: str) -> List[str]:
+        """Ids of everyone in the person's contact cluster (people.cluster_id, indexed)"""
+        # The dashboard opens contacts by their cluster id, so one query usually returns the whole cluster
+        quoted = self._quoted(person_id)
+        result = self.supabase.table('people') \
+            .select('*') \
+            .or_(f"id.eq.{quoted},cluster_id.eq.{quoted}") \
+            .execute()
+        rows = result.data or []
+        person = next((row for row in rows if str(row['id']) == str(person_id)), None)
+        if not person:
+            return []
+
+        cluster_id = person.get('cluster_id')
+        if not cluster_id:
+            # Stored before clusters existed: cluster them now so the next lookup is indexed
+            cluster_id = self._assign_clusters([person]).get(person['id'])
+            if not cluster_id:
+                return self._similar_person_ids(person_id, person)
+        elif str(cluster_id) == str(person_id):
+            return [row['id'] for row in rows if row.get('cluster_id') == cluster_id]
+
+        cluster_result = self.supabase.table('people') \
+            .select('id') \
+            .eq('cluster_id', cluster_id) \
+            .execute()
+        return [row['id'] for row in cluster_result.data or []] or [person_id]
+
+    def _similar_person_ids(self, person_id: str, main_person: Dict[str, Any]) -> List[str]:
+        """Fuzzy name/email scan for a person stored before contact clusters existed"""
+        main_name = main_person['name'].strip().lower()
+        main_email = main_person.get('email', '')
+
+        # Extract name from email
+        email_name = ""
+        if main_email and "@" in main_email:
+            email_name = main_email.split('@')[0].replace('.', ' ').replace('_', ' ').lower()
+
+        # Get all people and find similar ones
+        all_people = self.supabase.table('people').select('id, name, email').execute()
+        similar_person_ids = [person_id]  # Include the original person
+
+        for person in all_people.data or []:
+            if person['id'] == person_id:
+                continue
+
+            person_name = person['name'].strip().lower()
+            person_email = person.get('email', '')
+
+            # Check name similarity
+            if fuzz.ratio(main_name, person_name) > 85:
+                similar_person_ids.append(person['id'])
+                continue
+
+            # Check if main name matches person's email
+            if person_email and "@" in person_email:
+                person_email_name = person_email.split('@')[0].replace('.', ' ').replace('_', ' ').lower()
+                if fuzz.ratio(main_name, person_email_name) > 85:
+                    similar_person_ids.append(person['id'])
+                    continue
+
+            # Check if person name matches main email
+            if email_name and fuzz.ratio(person_name, email_name) > 85:
+                similar_person_ids.append(person['id'])
+                continue
+
+        return similar_person_ids
+
     def get_recent_messages(self, limit: int = 50):
         """Get recent messages across all accounts"""
         try:
@@ -1,22 +1,35 @@
+import asyncio
 import os
-import requests
-from urllib.parse import urljoin
+from typing import Any, Dict, List, Tuple
+
+if __name__ == "__main__":
+    import dotenv
+
+    dotenv.load_dotenv()  # unipile_service reads its config on import, so load .env first when run as a script
+
+from services.param_id_cache import MISSING, param_id_cache
+from services.profile_cache import profile_cache
+from services.unipile_resilience import UnipileUnavailable
+from services.unipile_service import unipile_service
+
 
 class UnipileClient:
     def __init__(self):
         self.api_key = os.getenv("UNIPILE_API_KEY")
         self.base_url = os.getenv("UNIPILE_BASE_URL").rstrip('/')
         self.account_id = os.getenv("ACCOUNT_ID")
-        self.headers = {
-            "X-API-KEY": self.api_key,
-            "accept": "application/json",
-            "content-type": "application/json"
-        }
-
-    def get_param_id(self, param_type: str, keyword: str) -> str | None:
-        resp = requests.get(
-            f"{self.base_url}/linkedin/search/parameters",
-            headers=self.headers,
+        # Profiles enriched at once for include_details searches
+        self.details_concurrency = int(os.getenv("LINKEDIN_DETAILS_CONCURRENCY", "8"))
+
+    async def get_param_id(self, param_type: str, keyword: str) -> str | None:
+        # Ids barely ever change, so repeat searches are answered from the cache
+        cached = await param_id_cache.get(param_type, keyword)
+        if cached is not MISSING:
+            return cached
+
+        resp = await unipile_service.request(
+            "GET",
+            "/linkedin/search/parameters",
             params={
                 "account_id": self.account_id,
                 "type": param_type,
@@ -30,104 +43,151 @@ class UnipileClient:
         if items:
             p = items[0]
             print(f"🔎 Found {param_type}={keyword} → {p['title']} (ID={p['id']})")
+            await param_id_cache.put(param_type, keyword, p["id"])
             return p["id"]
+        await param_id_cache.put(param_type, keyword, None)
         return None
 
-    def get_profile_details(self, identifier: str) -> dict:
-        """Get detailed profile information using the correct Unipile API endpoint"""
+    async def get_profile_details(self, identifier: str, persist: bool = True) -> dict:
+        """Get detailed profile information using the correct Unipile API endpoint (cached)"""
+        cached = await profile_cache.get_any([identifier])
+        if cached:
+            return cached
+
         try:
-            # Fix the URL - don't add /api/v1 again since base_url already has it
-            resp = requests.get(
-                f"{self.base_url}/users/{identifier}",  # Changed from /api/v1/users/
-                headers=self.headers,
+            resp = await unipile_service.request(
+                "GET",
+                f"/users/{identifier}",
                 params={"account_id": self.account_id},
                 timeout=30
             )
-            
+
             print(f"🔍 Profile API URL: {resp.url}")
             print(f"🔍 Profile API response status: {resp.status_code}")
-            
+
             if resp.status_code == 200:
                 profile_data = resp.json()
                 print(f"🔍 Profile keys: {list(profile_data.keys())}")
+                profile_cache.put(profile_data, identifier)
+                if persist:
+                    await asyncio.to_thread(profile_cache.persist)
                 return profile_data
             else:
                 print(f"❌ Profile API error: {resp.status_code} - {resp.text}")
                 return {}
-                
+
+        except UnipileUnavailable:
+            # No other identifier would get through either
+            raise
         except Exception as e:
             print(f"❌ Failed to get profile details for {identifier}: {e}")
             return {}
 
-    def classic_people_search(self, filters: dict, max_results: int = 40, count: int = 50, include_details: bool = False) -> list:
+    async def classic_people_search(self, filters: dict, max_results: int = 40, count: int = 50,
+                                    include_details: bool = False) -> list:
         results = []
         cursor = None
 
-        payload = {"api": "classic", "category": "people", "count": count}
-        payload.update(filters)
-
         while len(results) < max_results:
-            if cursor:
-                payload["cursor"] = cursor
-
-            resp = requests.post(
-                f"{self.base_url}/linkedin/search?account_id={self.account_id}",
-                headers=self.headers,
-                json=payload,
-                timeout=10,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            
-            batch = data.get("items") or data.get("elements") or []
+            batch, cursor = await self.search_page(filters, count, cursor)
             slice_count = min(max_results - len(results), len(batch))
             results.extend(batch[:slice_count])
-            cursor = data.get("cursor")
             if not cursor:
                 break
 
         # Fetch detailed profiles if requested
         if include_details:
-            print(f"🔍 Fetching detailed profiles for {len(results)} people...")
-            detailed_results = []
-            
-            for i, person in enumerate(results):
-                print(f"🔍 Processing {i+1}/{len(results)}: {person['name']}")
-                
-                # Try different identifier formats
-                identifiers_to_try = [
-                    person.get('public_identifier'),
-                    person.get('id'),
-                    person.get('member_urn')
-                ]
-                
-                profile_details = {}
-                for identifier in identifiers_to_try:
-                    if identifier:
-                        profile_details = self.get_profile_details(identifier)
-                        if profile_details:  # If we got data, break
-                            break
-                
-                # Merge search result with detailed profile
-                if profile_details:
-                    merged_profile = {**profile_details, **person}
-                    detailed_results.append(merged_profile)
-                    print(f"✅ Got detailed profile for {person['name']}")
-                else:
-                    detailed_results.append(person)
-                    print(f"⚠️ Using basic profile for {person['name']}")
-                    
-            return detailed_results
-        
+            return await self.enrich_profiles(results)
+
         return results
 
-if __name__ == "__main__":
-    import dotenv
-    dotenv.load_dotenv()
+    async def search_page(self, filters: dict, count: int = 50, cursor: str = None) -> Tuple[list, str | None]:
+        """One page of classic people search: (results, cursor of the next page or None)"""
+        payload = {"api": "classic", "category": "people", "count": count}
+        payload.update(filters)
+        if cursor:
+            payload["cursor"] = cursor
+
+        resp = await unipile_service.request(
+            "POST",
+            "/linkedin/search",
+            params={"account_id": self.account_id},
+            json=payload,
+            timeout=10,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        return data.get("items") or data.get("elements") or [], data.get("cursor")
+
+    async def enrich_profiles(self, people: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge each search result with its detailed profile, several profiles at a time, keeping order"""
+        print(f"🔍 Fetching detailed profiles for {len(people)} people...")
+        semaphore = asyncio.Semaphore(self.details_concurrency)
+
+        async def enrich(i: int, person: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                print(f"🔍 Processing {i + 1}/{len(people)}: {person.get('name')}")
+                return await self.enrich_profile(person)
+
+        try:
+            return list(await asyncio.gather(*(enrich(i, person) for i, person in enumerate(people))))
+        finally:
+            # Everything fetched for this search goes to disk in one transaction
+            await asyncio.to_thread(profile_cache.persist)
+
+    async def enrich_profile(self, person: Dict[str, Any]) -> Dict[str, Any]:
+        """The search result merged with its detailed profile, or as-is when there is none"""
+        try:
+            profile_details = await self.find_profile_details(person)
+        except UnipileUnavailable as e:
+            print(f"⚠️ Skipping details for {person.get('name')}: {e}")
+            profile_details = {}
+        return self.merge_profile(person, profile_details)
+
+    @staticmethod
+    def merge_profile(person: Dict[str, Any], profile_details: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge search result with detailed profile (the search result wins on conflicts)"""
+        if profile_details:
+            print(f"✅ Got detailed profile for {person.get('name')}")
+            return {**profile_details, **person}
+        print(f"⚠️ Using basic profile for {person.get('name')}")
+        return person
+
+    async def find_profile_details(self, person: Dict[str, Any]) -> Dict[str, Any]:
+        """Try the person's identifiers in order and stop at the first that returns a profile.
+
+        Raises UnipileUnavailable when Unipile cannot be asked in time, so callers
+        can tell "no profile" ({}) apart from "details skipped".
+        """
+        identifiers_to_try = [
+            person.get('public_identifier'),
+            person.get('id'),
+            person.get('member_urn')
+        ]
+
+        # A copy cached under any of them saves every request
+        cached = await profile_cache.get_any(identifiers_to_try)
+        if cached:
+            return cached
 
+        for identifier in identifiers_to_try:
+            if identifier:
+                profile_details = await self.get_profile_details(identifier, persist=False)
+                if profile_details:
+                    # Found again by any of the search result's identifiers next time
+                    profile_cache.put(profile_details, *identifiers_to_try)
+                    return profile_details
+        return {}
+
+async def _main():
     client = UnipileClient()
 
     # Test detailed profile fetch
     print("🧪 Testing profile details...")
-    test_profile = client.get_profile_details("muhammad-taha-dev1")
-    print(f"Test profile keys: {list(test_profile.keys()) if test_profile else 'No data'}")
\ No newline at end of file
+    test_profile = await client.get_profile_details("muhammad-taha-dev1")
+    print(f"Test profile keys: {list(test_profile.keys()) if test_profile else 'No data'}")
+    await unipile_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
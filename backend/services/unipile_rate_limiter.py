@@ -0,0 +1,171 @@
+# backend/services/unipile_rate_limiter.py
+
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+# Successful requests (relative to the current concurrency) before the limits grow again
+GROWTH_WINDOW = 10
+
+# 429s that arrive together come from one burst and shrink the limits only once
+DECREASE_COOLDOWN = 1.0
+
+
+class AdaptiveBucket:
+    """Token bucket plus a concurrency limit for one (account, endpoint class).
+
+    Both limits grow slowly while requests succeed and are halved on a 429,
+    so they settle just below the rate at which Unipile starts throttling. A
+    Retry-After pause holds back every caller that shares the bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, max_rate: float, concurrency: int, max_concurrency: int):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(rate, 0.2)
+        self.max_rate = max_rate
+        self.increase = rate * 0.1
+        self.limit = concurrency
+        self.max_concurrency = max_concurrency
+
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0
+        self.requests = 0
+        self._slots = asyncio.Condition()
+
+    async def acquire(self):
+        """Wait for a concurrency slot and a token"""
+        async with self._slots:
+            await self._slots.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.requests += 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        except BaseException:
+            await self.release()
+            raise
+
+    async def release(self):
+        async with self._slots:
+            self.in_flight -= 1
+            self._slots.notify_all()
+
+    def on_success(self):
+        self.successes += 1
+        if self.successes >= self.limit * GROWTH_WINDOW:
+            self.successes = 0
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self.limit = min(self.max_concurrency, self.limit + 1)
+
+    def on_throttled(self, retry_after: Optional[float]):
+        now = time.monotonic()
+        self.throttled += 1
+        self.successes = 0
+        if now - self.decreased_at >= DECREASE_COOLDOWN:
+            self.decreased_at = now
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.limit = max(1, self.limit // 2)
+            self.tokens = min(self.tokens, 0.0)
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "rate_per_sec": round(self.rate, 2),
+            "concurrency": self.limit,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 1)
+        }
+
+
+class UnipileRateLimiter:
+    """Adaptive limits for Unipile calls, one bucket per account and endpoint class"""
+
+    def __init__(self):
+        self.rate = float(os.getenv("UNIPILE_RATE_PER_SECOND", "5"))
+        self.max_rate = float(os.getenv("UNIPILE_MAX_RATE_PER_SECOND", "20"))
+        self.burst = int(os.getenv("UNIPILE_RATE_BURST", "10"))
+        self.concurrency = int(os.getenv("UNIPILE_CONCURRENCY", "4"))
+        self.max_concurrency = int(os.getenv("UNIPILE_MAX_CONCURRENCY", "16"))
+        self.max_retries = int(os.getenv("UNIPILE_MAX_RETRIES", "5"))
+        self.backoff_base = float(os.getenv("UNIPILE_BACKOFF_BASE", "0.5"))
+        self.backoff_max = float(os.getenv("UNIPILE_BACKOFF_MAX", "30"))
+        self.buckets: Dict[Tuple[str, str], AdaptiveBucket] = {}
+
+    @staticmethod
+    def endpoint_class(path: str) -> str:
+        """Group paths that Unipile limits together: /chats/{id}/messages -> messages"""
+        segments = [segment for segment in path.split("?")[0].strip("/").split("/") if segment]
+        if not segments:
+            return "other"
+        if "messages" in segments:
+            return "messages"
+        return segments[0]
+
+    @staticmethod
+    def account_for(path: str, params: Optional[Dict[str, Any]] = None, body: Any = None) -> str:
+        """Best guess at the account a request is made for"""
+        for source in (params, body):
+            if isinstance(source, dict) and source.get("account_id"):
+                return str(source["account_id"])
+
+        segments = path.strip("/").split("/")
+        if len(segments) > 1 and segments[0] == "accounts":
+            return segments[1]
+        return "global"
+
+    def bucket(self, account_id: str, endpoint_class: str) -> AdaptiveBucket:
+        key = (account_id, endpoint_class)
+        if key not in self.buckets:
+            self.buckets[key] = AdaptiveBucket(
+                self.rate, self.burst, self.max_rate, self.concurrency, self.max_concurrency
+            )
+        return self.buckets[key]
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def retry_after(value: Optional[str]) -> Optional[float]:
+        """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def stats(self, account_id: str = None) -> Dict[str, Dict[str, Any]]:
+        return {
+            f"{account}:{endpoint}": bucket.snapshot()
+            for (account, endpoint), bucket in self.buckets.items()
+            if account_id is None or account == account_id
+        }
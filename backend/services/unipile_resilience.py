@@ -0,0 +1,163 @@
+# backend/services/unipile_resilience.py
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# Monotonic time by which the current inbound request must be answered (None = no budget)
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("unipile_deadline", default=None)
+
+
+class UnipileUnavailable(Exception):
+    """Unipile was not called (or gave up) because it cannot answer in time"""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UnipileUnavailable):
+    pass
+
+
+class DeadlineExceeded(UnipileUnavailable):
+    pass
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Give every Unipile call made inside the block a shared time budget.
+
+    A budget that is already set (e.g. by the inbound request) is only ever
+    tightened, never extended.
+    """
+    if seconds is None:
+        yield
+        return
+
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def no_deadline():
+    """Run the block (and tasks created in it) outside the current request's budget"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """Seconds left in the current budget, or None when there is none"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def parse_budget(value: Optional[str]) -> Optional[float]:
+    """Budget in seconds from an X-Request-Timeout header, capped at REQUEST_DEADLINE_SECONDS.
+
+    A client may ask for less time than the server default, never more.
+    """
+    default = _seconds(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))
+    requested = _seconds(value)
+    if requested is None:
+        return default
+    return requested if default is None else min(requested, default)
+
+
+def _seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if seconds > 0 else None
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open single probe -> closed.
+
+    While open, calls fail immediately instead of waiting out timeouts against
+    an endpoint that is down. After reset_timeout one probe is let through; its
+    outcome closes the breaker or opens it again. A probe that has not reported
+    back within probe_timeout is treated as lost, so another one may go.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 probe_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.probe_started = 0.0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Raise CircuitOpenError unless a call may go through now.
+
+        Returns True when the call is the half-open probe; the caller must then
+        report its outcome (record_success/record_failure) or abandon() it.
+        """
+        if self.state == "closed":
+            return False
+
+        if self.state == "open":
+            wait = self.opened_at + self.reset_timeout - time.monotonic()
+            if wait > 0:
+                self.rejected += 1
+                raise CircuitOpenError(f"Unipile {self.name} endpoint unavailable (circuit open)", retry_after=wait)
+            self.state = "half_open"
+            self.probing = False
+
+        if self.probing:
+            if time.monotonic() - self.probe_started < self.probe_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"Unipile {self.name} endpoint unavailable (probing)", retry_after=1.0)
+            print(f"🔌 Circuit {self.name}: probe outstanding for over {self.probe_timeout:g}s, probing again")
+        self.probing = True
+        self.probe_started = time.monotonic()
+        print(f"🔌 Circuit {self.name}: half-open, probing")
+        return True
+
+    def abandon(self):
+        """The call that was allowed never reached Unipile"""
+        self.probing = False
+
+    def record_success(self):
+        if self.state != "closed":
+            print(f"🔌 Circuit {self.name}: closed")
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"🔌 Circuit {self.name}: open for {self.reset_timeout:g}s after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "retry_in": round(max(0.0, self.opened_at + self.reset_timeout - time.monotonic()), 1)
+            if self.state == "open" else 0.0
+        }
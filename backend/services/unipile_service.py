@@ -3,9 +3,16 @@
 import httpx
 import os
 import datetime
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Awaitable, Callable, Tuple
 import asyncio
 
+from services.unipile_rate_limiter import UnipileRateLimiter
+from services.unipile_resilience import CircuitBreaker, DeadlineExceeded, UnipileUnavailable, no_deadline, time_left
+
+# Cached account data is refreshed in the background once it is this far into its TTL
+ACCOUNT_REFRESH_AT = 0.8
+
 
 class UnipileService:
     def __init__(self):
@@ -20,12 +27,192 @@ class UnipileService:
             "accept": "application/json"
         }
 
+        # One pooled client for every Unipile call; created by the app lifespan
+        self.client: Optional[httpx.AsyncClient] = None
+        self.max_connections = int(os.getenv("UNIPILE_MAX_CONNECTIONS", "50"))
+        self.max_keepalive = int(os.getenv("UNIPILE_MAX_KEEPALIVE", "20"))
+        self.http2 = os.getenv("UNIPILE_HTTP2", "false").lower() == "true"
+        self.default_timeout = 30.0
+        self.rate_limiter = UnipileRateLimiter()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.breaker_failures = int(os.getenv("UNIPILE_BREAKER_FAILURES", "5"))
+        self.breaker_reset = float(os.getenv("UNIPILE_BREAKER_RESET_SECONDS", "30"))
+        self.breaker_probe_timeout = float(os.getenv("UNIPILE_BREAKER_PROBE_SECONDS", "60"))
+
+        # Account metadata: "accounts" -> list, "account:<id>" -> one account, as (fetched_at, data)
+        self.account_ttl = float(os.getenv("UNIPILE_ACCOUNT_CACHE_TTL", "300"))
+        self.account_cache: Dict[str, Tuple[float, Any]] = {}
+        self.account_refreshes: Dict[str, asyncio.Task] = {}
+
         # Debug info
         print(f"🔧 Unipile Service Config:")
         print(f"   API Key: {'✅ Set' if self.api_key else '❌ Missing'}")
         print(f"   Base URL: {self.base_url}")
         print(f"   DSN Base: {self.dsn_base}")
 
+    async def start(self):
+        """Open the shared HTTP client (called from the app lifespan)"""
+        if self.client is None:
+            self.client = self._create_client()
+
+    async def close(self):
+        """Close the shared HTTP client and its pooled connections"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def _create_client(self) -> httpx.AsyncClient:
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401 - httpx needs it for HTTP/2
+            except ImportError:
+                print("⚠️ UNIPILE_HTTP2 is set but the h2 package is missing, using HTTP/1.1")
+                http2 = False
+
+        print(f"🔌 Opening Unipile client (max {self.max_connections} connections, http2={http2})")
+        return httpx.AsyncClient(
+            base_url=self.base_url or "",
+            headers=self.headers,
+            timeout=httpx.Timeout(self.default_timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=60.0
+            ),
+            http2=http2
+        )
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """The shared client; opened lazily when used outside the app (scripts)"""
+        if self.client is None:
+            self.client = self._create_client()
+        return self.client
+
+    async def request(self, method: str, path: str, account_id: str = None, **kwargs) -> httpx.Response:
+        """Send a request to the Unipile API over the shared, keep-alive client.
+
+        Calls are paced per account and endpoint class. 429s wait out Retry-After
+        (or back off) and are retried; 5xx and connection errors are retried the
+        same way for idempotent methods. The last response is returned once the
+        retries run out, so callers still see the failure.
+
+        Each endpoint class has a circuit breaker, and every wait (pacing, the
+        HTTP call, backoff) is capped by the inbound request's deadline. Both
+        raise UnipileUnavailable instead of letting the caller hang.
+        """
+        limiter = self.rate_limiter
+        account_id = account_id or limiter.account_for(path, kwargs.get("params"), kwargs.get("json"))
+        endpoint = limiter.endpoint_class(path)
+        bucket = limiter.bucket(account_id, endpoint)
+        breaker = self.breaker(endpoint)
+        idempotent = method.upper() in ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+        timeout = kwargs.pop("timeout", None)
+
+        attempt = 0
+        while True:
+            probe = breaker.allow()
+            try:
+                await asyncio.wait_for(bucket.acquire(), self._time_left(method, path))
+            except asyncio.TimeoutError:
+                if probe:
+                    breaker.abandon()
+                raise DeadlineExceeded(f"Deadline passed waiting to call Unipile {method} {path}")
+            except BaseException:
+                if probe:
+                    breaker.abandon()
+                raise
+
+            budget = None
+            try:
+                call_timeout = self._call_timeout(timeout, method, path)
+                budget = time_left()
+                call = self.http.request(method, path, timeout=call_timeout, **kwargs)
+                response = await (asyncio.wait_for(call, budget) if budget is not None else call)
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                timed_out = isinstance(e, (httpx.TimeoutException, asyncio.TimeoutError))
+                if timed_out and budget is not None and budget < self._full_timeout(timeout):
+                    # Cut short by our caller's deadline, not by Unipile: not a failure of the endpoint
+                    if probe:
+                        breaker.abandon()
+                    raise DeadlineExceeded(f"Deadline passed during Unipile {method} {path}")
+                breaker.record_failure()
+                left = time_left()
+                if left is not None and left <= 0:
+                    raise DeadlineExceeded(f"Deadline passed during Unipile {method} {path}")
+                if isinstance(e, asyncio.TimeoutError):
+                    raise
+                if not idempotent or attempt >= limiter.max_retries:
+                    raise
+                delay = limiter.backoff(attempt)
+                print(f"⚠️ Unipile {method} {path} failed ({e!r}), retrying in {delay:.1f}s")
+            except BaseException:
+                # Cancelled, out of budget or a non-transport error: the probe
+                # never got an answer, so it must not hold the breaker half-open
+                if probe:
+                    breaker.abandon()
+                raise
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                if response.status_code == 429:
+                    retry_after = limiter.retry_after(response.headers.get("Retry-After"))
+                    bucket.on_throttled(retry_after)
+                    delay = retry_after if retry_after is not None else limiter.backoff(attempt)
+                elif response.status_code >= 500 and idempotent:
+                    delay = limiter.backoff(attempt)
+                else:
+                    bucket.on_success()
+                    return response
+
+                left = time_left()
+                if attempt >= limiter.max_retries or (left is not None and delay >= left):
+                    return response
+                print(f"⏳ Unipile {method} {path} returned {response.status_code}, "
+                      f"retrying in {delay:.1f}s ({account_id}/{endpoint})")
+            finally:
+                await bucket.release()
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """Circuit breaker for one endpoint class"""
+        if endpoint not in self.breakers:
+            self.breakers[endpoint] = CircuitBreaker(
+                endpoint, failure_threshold=self.breaker_failures, reset_timeout=self.breaker_reset,
+                probe_timeout=self.breaker_probe_timeout
+            )
+        return self.breakers[endpoint]
+
+    @staticmethod
+    def _time_left(method: str, path: str) -> Optional[float]:
+        left = time_left()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded(f"Deadline passed before calling Unipile {method} {path}")
+        return left
+
+    def _full_timeout(self, timeout: Any) -> float:
+        """Seconds a call may take when no deadline shortens it"""
+        if isinstance(timeout, (int, float)):
+            return float(timeout)
+        if isinstance(timeout, httpx.Timeout):
+            return timeout.read or self.default_timeout
+        return self.default_timeout
+
+    def _call_timeout(self, timeout: Any, method: str, path: str) -> Any:
+        """The per-call timeout, shortened to whatever is left of the deadline"""
+        left = self._time_left(method, path)
+        if left is None:
+            return timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        if isinstance(timeout, (int, float)):
+            return min(timeout, left)
+        return httpx.Timeout(left, connect=min(10.0, left))
+
     async def create_hosted_auth_link(self, providers: List[str], user_id: str) -> str:
         """Create Unipile hosted auth link for providers - matches working script"""
 
@@ -55,27 +242,22 @@ class UnipileService:
             print(f"   Payload: {payload}")
 
             # Make request
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/hosted/accounts/link",
-                    headers=self.headers,
-                    json=payload
-                )
-
-                print(f"📥 Response:")
-                print(f"   Status: {response.status_code}")
-                print(f"   Body: {response.text}")
-
-                response.raise_for_status()
-                data = response.json()
+            response = await self.request("POST", "/hosted/accounts/link", json=payload)
 
-                auth_url = data.get("url")
-                if auth_url:
-                    print(f"✅ Success! Real Unipile URL: {auth_url}")
-                    return auth_url
-                else:
-                    print(f"❌ No URL in response: {data}")
-                    return f"{os.getenv('FRONTEND_URL')}/auth/success?mock=true&provider={providers[0].lower()}"
+            print(f"📥 Response:")
+            print(f"   Status: {response.status_code}")
+            print(f"   Body: {response.text}")
+
+            response.raise_for_status()
+            data = response.json()
+
+            auth_url = data.get("url")
+            if auth_url:
+                print(f"✅ Success! Real Unipile URL: {auth_url}")
+                return auth_url
+            else:
+                print(f"❌ No URL in response: {data}")
+                return f"{os.getenv('FRONTEND_URL')}/auth/success?mock=true&provider={providers[0].lower()}"
 
         except httpx.HTTPStatusError as e:
             print(f"❌ HTTP Error {e.response.status_code}: {e.response.text}")
@@ -121,68 +303,95 @@ class UnipileService:
             print(f"   Success URL: {success_url}")
             print(f"   Payload: {payload}")
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/hosted/accounts/link",
-                    headers=self.headers,
-                    json=payload
-                )
+            response = await self.request("POST", "/hosted/accounts/link", json=payload)
 
-                print(f"📥 Unipile Response: {response.status_code} - {response.text}")
+            print(f"📥 Unipile Response: {response.status_code} - {response.text}")
 
-                response.raise_for_status()
-                data = response.json()
-                auth_url = data.get("url")
+            response.raise_for_status()
+            data = response.json()
+            auth_url = data.get("url")
 
-                if auth_url:
-                    print(f"✅ Success with callbacks! URL: {auth_url}")
-                    return auth_url
-                else:
-                    # Fallback to basic version without callbacks
-                    print("⚠️ Callbacks failed, trying basic version...")
-                    return await self.create_hosted_auth_link(providers, user_id)
+            if auth_url:
+                print(f"✅ Success with callbacks! URL: {auth_url}")
+                return auth_url
+            else:
+                # Fallback to basic version without callbacks
+                print("⚠️ Callbacks failed, trying basic version...")
+                return await self.create_hosted_auth_link(providers, user_id)
 
         except Exception as e:
             print(f"❌ Callbacks failed: {e}")
             # Fallback to basic version without callbacks
             return await self.create_hosted_auth_link(providers, user_id)
 
-    async def get_account_info(self, account_id: str) -> Dict[str, Any]:
-        """Get account information from Unipile"""
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/accounts/{account_id}",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()
-        except Exception as e:
-            print(f"Error getting account info: {e}")
-            # Return mock account info for development
-            return {
-                "id": account_id,
-                "provider": "GOOGLE" if "google" in account_id.lower() else "LINKEDIN",
-                "email": "user@gmail.com" if "google" in account_id.lower() else None,
-                "name": "Test User",
-                "status": "OK"
-            }
+    async def get_account_info(self, account_id: str, refresh: bool = False) -> Dict[str, Any]:
+        """Get account information from Unipile (cached); raises when it cannot be fetched"""
+        return await self._cached_account_data(f"account:{account_id}", lambda: self._fetch_account(account_id),
+                                               refresh)
 
-    async def get_all_accounts(self) -> List[Dict[str, Any]]:
-        """Get all connected accounts"""
+    async def get_all_accounts(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """Get all connected accounts (cached)"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/accounts",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("items", [])  # Unipile returns {"object":"AccountList","items":[],"cursor":null}
+            return await self._cached_account_data("accounts", self._fetch_all_accounts, refresh)
+        except UnipileUnavailable:
+            # An outage is not the same as having no accounts
+            raise
         except Exception as e:
             print(f"Error getting accounts: {e}")
             return []
 
+    def invalidate_accounts(self, account_id: str = None):
+        """Drop cached account data after Unipile reports a change (one account, or everything)"""
+        keys = ["accounts", f"account:{account_id}"] if account_id else list(self.account_cache)
+        for key in keys:
+            self.account_cache.pop(key, None)
+            refresh = self.account_refreshes.pop(key, None)
+            if refresh:
+                refresh.cancel()
+        print(f"🗑️ Account cache invalidated ({account_id or 'all accounts'})")
+
+    async def _fetch_account(self, account_id: str) -> Dict[str, Any]:
+        response = await self.request("GET", f"/accounts/{account_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def _fetch_all_accounts(self) -> List[Dict[str, Any]]:
+        response = await self.request("GET", "/accounts")
+        response.raise_for_status()
+        accounts = response.json().get("items", [])  # Unipile returns {"object":"AccountList","items":[],"cursor":null}
+
+        # The list already carries every account, so single lookups can use it too
+        fetched_at = time.monotonic()
+        for account in accounts:
+            if account.get("id"):
+                self.account_cache[f"account:{account['id']}"] = (fetched_at, account)
+        return accounts
+
+    async def _cached_account_data(self, key: str, fetch: Callable[[], Awaitable[Any]], refresh: bool) -> Any:
+        """Serve fresh entries from memory, refresh ageing ones in the background, fetch the rest"""
+        entry = self.account_cache.get(key)
+        if entry and not refresh:
+            age = time.monotonic() - entry[0]
+            if age < self.account_ttl:
+                if age >= self.account_ttl * ACCOUNT_REFRESH_AT and key not in self.account_refreshes:
+                    with no_deadline():
+                        self.account_refreshes[key] = asyncio.create_task(self._refresh_account_data(key, fetch))
+                return entry[1]
+
+        data = await fetch()
+        self.account_cache[key] = (time.monotonic(), data)
+        return data
+
+    async def _refresh_account_data(self, key: str, fetch: Callable[[], Awaitable[Any]]):
+        try:
+            self.account_cache[key] = (time.monotonic(), await fetch())
+        except Exception as e:
+            # The current entry keeps serving until it expires
+            print(f"⚠️ Background refresh of {key} failed: {e}")
+        finally:
+            if self.account_refreshes.get(key) is asyncio.current_task():
+                self.account_refreshes.pop(key, None)
+
     async def fetch_all_messages(self, account_id: str, callback=None) -> List[Dict[str, Any]]:
         """Fetch all messages from an account with pagination"""
         all_messages = []
@@ -209,9 +418,6 @@ class UnipileService:
                 if not cursor:
                     break
 
-                # Small delay to avoid rate limiting
-                await asyncio.sleep(0.2)
-
             print(f"📧 Total messages fetched: {len(all_messages)}")
             return all_messages
 
@@ -223,27 +429,21 @@ class UnipileService:
         str, Any]:
         """Fetch a batch of messages"""
         try:
-            print(f"Accounts {await self.get_all_accounts()}")
             params = {"limit": limit}
             if cursor:
                 params["cursor"] = cursor
 
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/accounts/{account_id}/messages",
-                    headers=self.headers,
-                    params=params
-                )
+            response = await self.request("GET", f"/accounts/{account_id}/messages", params=params, timeout=60.0)
 
-                print(f"📥 Unipile messages API response: {response.status_code}")
+            print(f"📥 Unipile messages API response: {response.status_code}")
 
-                if response.status_code == 200:
-                    data = response.json()
-                    print(f"📧 Batch: {len(data.get('items', []))} messages")
-                    return data
-                else:
-                    print(f"❌ API Error: {response.status_code} - {response.text}")
-                    return {"items": []}
+            if response.status_code == 200:
+                data = response.json()
+                print(f"📧 Batch: {len(data.get('items', []))} messages")
+                return data
+            else:
+                print(f"❌ API Error: {response.status_code} - {response.text}")
+                return {"items": []}
 
         except Exception as e:
             print(f"❌ Error fetching message batch: {e}")
@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import {
   Mail,
   Linkedin,
@@ -16,6 +16,9 @@ import {
 } from 'lucide-react'
 import { api, Person, Message, Account } from '@/lib/api'
 
+// Messages fetched per timeline page; older ones load on demand
+const MESSAGES_PAGE_SIZE = 50
+
 export default function EmailDashboard() {
   const [people, setPeople] = useState<Person[]>([])
   const [selectedPerson, setSelectedPerson] = useState<Person | null>(null)
@@ -23,6 +26,9 @@ export default function EmailDashboard() {
   const [accounts, setAccounts] = useState<Account[]>([])
   const [loading, setLoading] = useState(true)
   const [messagesLoading, setMessagesLoading] = useState(false)
+  const [messagesCursor, setMessagesCursor] = useState<string | null>(null)
+  const [loadingMoreMessages, setLoadingMoreMessages] = useState(false)
+  const selectedPersonId = useRef<string | null>(null)
   const [searchTerm, setSearchTerm] = useState('')
   const [selectedChannel, setSelectedChannel] = useState<'all' | 'email' | 'linkedin'>('all')
   const [error, setError] = useState<string | null>(null)
@@ -62,9 +68,15 @@ export default function EmailDashboard() {
     try {
       setMessagesLoading(true)
       setSelectedPerson(person)
+      selectedPersonId.current = person.id
+
+      setPersonMessages([])
+      setMessagesCursor(null)
 
-      const data = await api.getPersonMessages(person.id)
+      const data = await api.getPersonMessages(person.id, MESSAGES_PAGE_SIZE)
+      if (selectedPersonId.current !== person.id) return
       setPersonMessages(data.messages)
+      setMessagesCursor(data.next_cursor)
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to load messages')
     } finally {
@@ -72,6 +84,24 @@ export default function EmailDashboard() {
     }
   }
 
+  const loadMoreMessages = async () => {
+    if (!selectedPerson || !messagesCursor || loadingMoreMessages) return
+    const personId = selectedPerson.id
+    try {
+      setLoadingMoreMessages(true)
+
+      const data = await api.getPersonMessages(personId, MESSAGES_PAGE_SIZE, messagesCursor)
+      // Ignore a page that arrives after another contact was selected
+      if (selectedPersonId.current !== personId) return
+      setPersonMessages(messages => [...messages, ...data.messages])
+      setMessagesCursor(data.next_cursor)
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to load messages')
+    } finally {
+      setLoadingMoreMessages(false)
+    }
+  }
+
   const formatDate = (timestamp: string) => {
     return new Date(timestamp).toLocaleDateString('en-US', {
       month: 'short',
@@ -290,7 +320,7 @@ export default function EmailDashboard() {
                           </button>
 
                           <span className="text-sm text-gray-500">
-                            {personMessages.length} messages
+                            {personMessages.length}{messagesCursor ? '+' : ''} messages
                           </span>
                         </div>
                       </div>
@@ -352,6 +382,18 @@ export default function EmailDashboard() {
                               </div>
                             </div>
                           ))}
+                          {messagesCursor && (
+                            <div className="p-4 text-center">
+                              <button
+                                onClick={loadMoreMessages}
+                                disabled={loadingMoreMessages}
+                                className="inline-flex items-center space-x-2 px-4 py-2 text-sm bg-white border border-gray-300 rounded-lg hover:bg-gray-50 transition-colors disabled:opacity-50"
+                              >
+                                {loadingMoreMessages && <RefreshCw className="w-4 h-4 animate-spin" />}
+                                <span>{loadingMoreMessages ? 'Loading...' : 'Load older messages'}</span>
+                              </button>
+                            </div>
+                          )}
                         </div>
                       )}
                     </div>
@@ -148,8 +148,12 @@ export const api = {
   },
 
   // Get messages for a specific person
-  async getPersonMessages(personId: string): Promise<{ messages: Message[], total: number }> {
-    const response = await fetch(`${API_BASE}/api/people/${personId}/messages`)
+  async getPersonMessages(personId: string, limit?: number, cursor?: string): Promise<{ messages: Message[], total: number, next_cursor: string | null }> {
+    const params = new URLSearchParams()
+    if (limit) params.set('limit', String(limit))
+    if (cursor) params.set('cursor', cursor)
+    const query = params.toString()
+    const response = await fetch(`${API_BASE}/api/people/${personId}/messages${query ? `?${query}` : ''}`)
     if (!response.ok) throw new Error('Failed to get person messages')
     return response.json()
   },